@@ -0,0 +1,150 @@
+import os
+import glob
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+import data
+from atomic_file import atomic_path
+
+# ---------------------- 1. 配置参数 ----------------------
+# 及格线（通过率统计口径）
+PASS_SCORE = 60
+# 需要求和的字段：标准化字段名 → 聚合表中的求和列名
+SUM_FIELDS = {
+    "midterm_score": "midterm_sum",
+    "final_score": "final_sum",
+    "study_hours": "study_hours_sum",
+    "attendance": "attendance_sum"
+}
+# 聚合表列：按（专业，性别）维护人数、各字段之和、及格人数，均可直接相加实现增量更新
+AGGREGATE_COLUMNS = ["count", *SUM_FIELDS.values(), "pass_count"]
+
+
+# ---------------------- 2. 聚合表构建与增量更新 ----------------------
+def build_major_aggregates(df: pd.DataFrame) -> pd.DataFrame:
+    """由明细数据计算（专业，性别）粒度的人数、求和与及格人数"""
+    sums = df[list(SUM_FIELDS)].astype("float64").rename(columns=SUM_FIELDS)
+    sums["count"] = 1
+    sums["pass_count"] = (df["final_score"] >= PASS_SCORE).astype("int64")
+    # 直接按原列分组（category列无需先转成字符串），结果索引再统一为字符串便于增量相加
+    store = sums.groupby([df["major"].rename("major"), df["gender"].rename("gender")], sort=True, observed=True).sum()
+    store.index = pd.MultiIndex.from_arrays(
+        [store.index.get_level_values(level).astype(str) for level in ["major", "gender"]], names=["major", "gender"])
+    return store[AGGREGATE_COLUMNS].sort_index()
+
+
+def update_major_aggregates(store: pd.DataFrame, new_rows: pd.DataFrame) -> pd.DataFrame:
+    """新增明细行时只累加计数与求和，无需重新扫描历史数据"""
+    if len(new_rows) == 0:
+        return store
+    delta = build_major_aggregates(new_rows)
+    updated = store.add(delta, fill_value=0)
+    updated[["count", "pass_count"]] = updated[["count", "pass_count"]].astype("int64")
+    return updated[AGGREGATE_COLUMNS]
+
+
+# ---------------------- 3. 聚合表持久化（按数据版本） ----------------------
+def aggregates_path(version: str, file_path: str = None) -> str:
+    """某数据源（默认data.FILE_PATH）、某数据版本对应的聚合表文件路径"""
+    file_path = data.FILE_PATH if file_path is None else file_path
+    return os.path.join(data.CACHE_DIR, f"major_aggregates-{data.source_key(file_path)}-{version}.arrow")
+
+
+def save_major_aggregates(store: pd.DataFrame, version: str, file_path: str = None) -> str:
+    """将聚合表写入缓存目录（原子替换），并清理同一数据源的旧版本聚合表"""
+    os.makedirs(data.CACHE_DIR, exist_ok=True)
+    path = aggregates_path(version, file_path)
+    with atomic_path(path) as tmp_path:
+        feather.write_feather(store.reset_index(), tmp_path, compression="uncompressed")
+    prefix = path[:-len(f"{version}.arrow")]
+    data.remove_stale_files(f"{glob.escape(prefix)}*.arrow", keep=[path])
+    return path
+
+
+def load_major_aggregates(version: str, file_path: str = None):
+    """读取某数据版本的聚合表（监听刷新时由refresh.py增量维护并写入），不存在或损坏时返回None"""
+    path = aggregates_path(version, file_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        return feather.read_feather(path).set_index(["major", "gender"])
+    except Exception:
+        return None
+
+
+# ---------------------- 4. 页面所需的派生指标（直接由聚合表计算） ----------------------
+def _major_totals(store: pd.DataFrame) -> pd.DataFrame:
+    """按专业汇总（合并性别）"""
+    return store.groupby(level="major", sort=True).sum()
+
+
+def gender_ratio(store: pd.DataFrame) -> pd.DataFrame:
+    """各专业男女比例，列为 major/男/女"""
+    counts = store["count"].unstack("gender", fill_value=0)
+    for gender in ["男", "女"]:
+        if gender not in counts.columns:
+            counts[gender] = 0
+    ratio = counts.div(counts.sum(axis=1), axis=0)
+    ratio.columns.name = None
+    return ratio.reset_index()
+
+
+def major_means(store: pd.DataFrame) -> pd.DataFrame:
+    """各专业期中/期末成绩与学习时长均值"""
+    totals = _major_totals(store)
+    means = pd.DataFrame({
+        "midterm_score": totals["midterm_sum"] / totals["count"],
+        "final_score": totals["final_sum"] / totals["count"],
+        "study_hours": totals["study_hours_sum"] / totals["count"]
+    })
+    return means.reset_index()
+
+
+def attendance_means(store: pd.DataFrame) -> pd.DataFrame:
+    """各专业平均出勤率"""
+    totals = _major_totals(store)
+    return (totals["attendance_sum"] / totals["count"]).rename("attendance").reset_index()
+
+
+def major_summary(store: pd.DataFrame, major: str) -> dict:
+    """单个专业的核心指标：平均出勤率、平均期末成绩、通过率、平均学习时长"""
+    totals = _major_totals(store).loc[major]
+    return {
+        "attendance": totals["attendance_sum"] / totals["count"],
+        "final_score": totals["final_sum"] / totals["count"],
+        "pass_rate": totals["pass_count"] / totals["count"],
+        "study_hours": totals["study_hours_sum"] / totals["count"]
+    }
+
+
+def list_majors(store: pd.DataFrame) -> list:
+    """聚合表中的专业列表"""
+    return list(store.index.get_level_values("major").unique())
+
+
+# ---------------------- 5. 分布图摘要（服务端分箱，图表数据量与行数无关） ----------------------
+def histogram_summary(values, nbins: int = 20) -> dict:
+    """等宽分箱的直方图：返回分箱边界与各箱人数"""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    counts, edges = np.histogram(values, bins=nbins)
+    return {"edges": edges, "counts": counts}
+
+
+def box_summary(values) -> dict:
+    """箱线图统计量：四分位数、均值，以及按1.5倍四分位距确定的上下须（须端取范围内的实际最值）"""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    return {
+        "q1": q1,
+        "median": median,
+        "q3": q3,
+        "mean": values.mean(),
+        "lowerfence": inside.min(),
+        "upperfence": inside.max(),
+        "n_outliers": int(len(values) - len(inside))
+    }
@@ -0,0 +1,24 @@
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+
+# ---------------------- 原子写入（写临时文件后os.replace） ----------------------
+@contextmanager
+def atomic_path(path: str, suffix: str = ""):
+    """产出与path同目录的临时路径供写入，写入成功后原子替换path，读取方只会看到完整的旧文件或新文件
+
+    临时路径含进程号与线程号，并发写入同一目标时互不覆盖；写入出错时删除临时文件（或目录）后重新抛出。
+    suffix用于会自动补扩展名的写入函数（如np.save对不以.npy结尾的路径追加.npy）
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp{suffix}"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        elif os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
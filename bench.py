@@ -0,0 +1,340 @@
+import io
+import os
+import gc
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+import tempfile
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+import numpy as np
+import pandas as pd
+
+import data
+from atomic_file import atomic_path
+from aggregates import build_major_aggregates, gender_ratio, major_means, attendance_means, update_major_aggregates
+from linear_predictor import FEATURE_COLS, LinearPredictor, fuse_linear_pipeline, load_fused_model
+from training_stats import empty_stats, accumulate_stats, solve_linear_model
+from synth import GENERATOR_VERSION, parse_rows, write_synthetic
+
+# ---------------------- 1. 配置参数 ----------------------
+# 默认测试规模（行数）
+DEFAULT_SCALES = ["10k", "1m", "10m"]
+# 合成数据缓存目录（同一规模与随机种子只生成一次）
+BENCH_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".bench_data")
+# 默认结果文件
+DEFAULT_OUTPUT = "bench_results.json"
+# 比较模式下判定为性能回退的相对阈值（耗时或峰值内存增加超过20%）
+DEFAULT_THRESHOLD = 0.2
+# 比较的指标：耗时用多次测量的最小值（旧版结果中无该字段时用seconds），内存用峰值
+COMPARE_METRICS = {"seconds": "seconds_min", "peak_mb": "peak_mb"}
+# 判定回退的最小绝对增量（避免毫秒级测试项的计时抖动被误报）
+MIN_REGRESSION_DELTA = {"seconds": 0.005, "peak_mb": 1.0}
+# 合成数据中各特征的缺失比例
+BENCH_MISSING_RATE = 0.005
+# 每个测试项的重复次数（记录中位数与最小值）
+BENCH_REPEATS = 5
+# 单条预测测量次数（取中位数）
+SINGLE_PREDICT_REPEATS = 2000
+# 页面测试：web1的页面 → 测试项名称
+WEB_PAGES = {"项目介绍": "intro", "专业数据分析": "analysis", "成绩预测": "predict"}
+# 页面测试：每个页面重复运行次数（取中位数）
+WEB_RERUNS = 5
+
+
+# ---------------------- 2. 合成数据（与真实CSV字段一致） ----------------------
+def synthetic_csv(rows: int, seed: int = 42) -> str:
+    """返回指定规模的合成数据文件路径（synth.py生成，含少量缺失值以覆盖缺失值处理），不存在时生成"""
+    os.makedirs(BENCH_DATA_DIR, exist_ok=True)
+    path = os.path.join(BENCH_DATA_DIR, f"synthetic_{rows}_{seed}_v{GENERATOR_VERSION}.csv")
+    if not os.path.exists(path):
+        with atomic_path(path) as tmp_path:
+            write_synthetic(tmp_path, rows, seed, missing_rate=BENCH_MISSING_RATE, fmt="csv")
+    return path
+
+
+# ---------------------- 3. 计时与内存测量 ----------------------
+def format_seconds(seconds: float) -> str:
+    """耗时的显示文本：不足1毫秒时以微秒显示"""
+    return f"{seconds * 1e6:.2f}us" if seconds < 1e-3 else f"{seconds:.4f}s"
+
+
+class BenchRecorder:
+    """记录各测试项的耗时、CPU时间与峰值内存（tracemalloc统计的Python/NumPy分配）
+
+    每个测试项重复执行repeats次，记录耗时的中位数与最小值（与基线比较时用最小值，受计时抖动影响最小）
+    """
+
+    def __init__(self, scale: int, track_memory: bool = True, repeats: int = BENCH_REPEATS):
+        self.scale = scale
+        self.track_memory = track_memory
+        self.repeats = max(1, repeats)
+        self.results = []
+
+    def measure(self, name: str, func, setup=None, rows: int = None):
+        """重复执行func；setup为每次执行前不计时的输入准备（返回func的参数元组，用于会原地修改输入的阶段），返回最后一次的结果
+
+        计时的各次执行不开启tracemalloc（其开销随分配次数波动，会放大计时抖动），峰值内存在额外一次执行中单独测量
+        """
+        timings, cpu_timings = [], []
+        for _ in range(self.repeats):
+            args = setup() if setup is not None else ()
+            gc.collect()
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            result = func(*args)
+            timings.append(time.perf_counter() - wall_start)
+            cpu_timings.append(time.process_time() - cpu_start)
+        peak_mb = None
+        if self.track_memory:
+            args = setup() if setup is not None else ()
+            gc.collect()
+            tracemalloc.start()
+            try:
+                func(*args)
+                peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            finally:
+                tracemalloc.stop()
+        self.record(name, timings, rows, cpu_timings, peak_mb)
+        return result
+
+    def record(self, name: str, timings: list, rows: int = None, cpu_timings: list = None, peak_mb: float = None):
+        """由多次测量的耗时（秒）生成一条结果"""
+        seconds = float(np.median(timings))
+        rows = self.scale if rows is None else rows
+        self.results.append({
+            "scale": self.scale,
+            "name": name,
+            "seconds": seconds,
+            "seconds_min": float(np.min(timings)),
+            "repeats": len(timings),
+            "cpu_seconds": float(np.median(cpu_timings)) if cpu_timings else None,
+            "peak_mb": peak_mb,
+            "rows": rows,
+            "rows_per_sec": rows / seconds if rows and seconds > 0 else None
+        })
+        print(f"  {name:<36} {format_seconds(seconds):>10}  (min {format_seconds(np.min(timings))}, n={len(timings)})"
+              + (f"  {peak_mb:>9.1f}MB" if peak_mb is not None else ""))
+
+
+@contextmanager
+def isolated_training_env(csv_path: str):
+    """在临时工作目录中运行model.py的训练：数据文件指向合成数据，缓存与保存的模型文件均写入临时目录（不覆盖仓库中的模型）"""
+    saved_paths = data.FILE_PATH, data.CACHE_DIR
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench_train_") as tmp_dir:
+        data.FILE_PATH, data.CACHE_DIR = csv_path, os.path.join(tmp_dir, ".cache")
+        os.chdir(tmp_dir)
+        try:
+            yield tmp_dir
+        finally:
+            os.chdir(cwd)
+            data.FILE_PATH, data.CACHE_DIR = saved_paths
+
+
+# ---------------------- 4. 测试项 ----------------------
+def bench_data_stages(recorder: BenchRecorder, csv_path: str) -> pd.DataFrame:
+    """data.py各阶段：读取→标准化→缺失值处理→补充字段→类型转换，以及流式分块处理（各阶段的输入每次重新复制）"""
+    raw_df = recorder.measure("data.load_raw_data", lambda: data.load_raw_data(csv_path))
+    df = recorder.measure("data.standardize_fields", data.standardize_fields, lambda: (raw_df.copy(),))
+    del raw_df
+    df = recorder.measure("data.handle_missing_values", data.handle_missing_values, lambda: (df.copy(),))
+    df = recorder.measure("data.supplement_required_fields", data.supplement_required_fields, lambda: (df.copy(),))
+    df = recorder.measure("data.convert_data_types", data.convert_data_types, lambda: (df.copy(),))
+
+    def stream_chunks():
+        for _ in data.iter_processed_chunks(csv_path):
+            pass
+    recorder.measure("data.iter_processed_chunks", stream_chunks)
+    return df
+
+
+def bench_training(recorder: BenchRecorder, csv_path: str, df: pd.DataFrame) -> LinearPredictor:
+    """model.py训练：真实入口train_full_model（加载→标准化→划分→训练→评估→保存），以及按块累加充分统计量
+
+    train_full_model首次运行（解析CSV并写入数据缓存）不计时，计时的是数据缓存命中后的完整训练流程
+    """
+    import model  # 导入sklearn等训练依赖，仅训练测试项需要
+
+    with isolated_training_env(csv_path):
+        def train_quietly():
+            with redirect_stdout(io.StringIO()):  # train_full_model的过程输出不混入测试结果
+                return model.train_full_model()
+        train_quietly()
+        metrics = recorder.measure("model.train_full_model", train_quietly)
+        predictor = load_fused_model(model.FUSED_MODEL_PATH) if metrics["saved"] else None
+    if predictor is None:
+        print(f"  警告：train_full_model未保存模型（R²={metrics['r2']:.3f}），预测测试改用全量数据直接拟合的模型")
+
+    X = df[FEATURE_COLS].to_numpy()
+    y = df["final_score"].to_numpy()
+
+    def fit_incremental():
+        stats = empty_stats(len(FEATURE_COLS))
+        for start in range(0, len(X), 1_000_000):
+            stats = accumulate_stats(stats, X[start:start + 1_000_000], y[start:start + 1_000_000])
+        return solve_linear_model(stats)
+    solution = recorder.measure("model.fit_incremental_stats", fit_incremental)
+    if predictor is None:
+        fitted_model, scaler = model.build_sklearn_pipeline(solution)
+        predictor = LinearPredictor(*fuse_linear_pipeline(scaler, fitted_model))
+    return predictor
+
+
+def bench_prediction(recorder: BenchRecorder, predictor: LinearPredictor, df: pd.DataFrame):
+    """单条预测（表单场景，取中位数）与整批向量化预测"""
+    single_row = df[FEATURE_COLS].to_numpy()[:1]
+    timings = []
+    for _ in range(SINGLE_PREDICT_REPEATS):
+        start = time.perf_counter()
+        predictor.predict(single_row)
+        timings.append(time.perf_counter() - start)
+    recorder.record("predict.single", timings, rows=1)
+    recorder.measure("predict.batch", lambda: predictor.predict(df[FEATURE_COLS].to_numpy()))
+
+
+def bench_aggregations(recorder: BenchRecorder, df: pd.DataFrame):
+    """web1专业分析页的聚合计算：原始行groupby、聚合表构建、由聚合表派生指标与增量更新"""
+    def raw_groupby():
+        df.groupby(["major", "gender"], observed=True).size().unstack(fill_value=0)
+        df.groupby("major", observed=True)[["midterm_score", "final_score", "study_hours", "attendance"]].mean()
+    recorder.measure("web1.raw_groupby", raw_groupby)
+    store = recorder.measure("web1.build_major_aggregates", lambda: build_major_aggregates(df))
+
+    def read_aggregates():
+        gender_ratio(store)
+        major_means(store)
+        attendance_means(store)
+    recorder.measure("web1.read_aggregates", read_aggregates, rows=len(store))
+    tail = df.iloc[-min(len(df), 10_000):]
+    recorder.measure("web1.update_major_aggregates", lambda: update_major_aggregates(store, tail), rows=len(tail))
+
+
+# 在独立的Python进程中测量单个页面（进程内只导入streamlit，模块导入与缓存均从冷状态开始）
+WEB_PAGE_SCRIPT = """
+import sys, json, time, statistics
+from streamlit.testing.v1 import AppTest
+app_path, page, reruns = sys.argv[1], sys.argv[2], int(sys.argv[3])
+result = {}
+start = time.perf_counter()
+at = AppTest.from_file(app_path, default_timeout=300).run()
+result["startup"] = time.perf_counter() - start
+start = time.perf_counter()
+at.sidebar.radio[0].set_value(page).run()
+result["first_view"] = time.perf_counter() - start
+timings = []
+for _ in range(reruns):
+    start = time.perf_counter()
+    at.run()
+    timings.append(time.perf_counter() - start)
+result["rerun"] = statistics.median(timings)
+result["errors"] = [str(e.value) for e in at.exception]
+print(json.dumps(result))
+"""
+
+
+def bench_web_pages(recorder: BenchRecorder, app_path: str = "web1.py", reruns: int = WEB_RERUNS):
+    """web1各页面：冷启动首次运行（默认页）、首次切换到该页面、该页面重复运行（交互触发的整页重跑）的耗时"""
+    app_dir = os.path.dirname(os.path.abspath(app_path))
+    for page, key in WEB_PAGES.items():
+        completed = subprocess.run([sys.executable, "-c", WEB_PAGE_SCRIPT, os.path.abspath(app_path), page, str(reruns)],
+                                   cwd=app_dir, capture_output=True, text=True, check=True)
+        timings = json.loads(completed.stdout.strip().splitlines()[-1])
+        if timings["errors"]:
+            print(f"  警告：{page}页面运行出错：{timings['errors'][:1]}")
+        for metric in ["startup", "first_view", "rerun"]:
+            name = f"web.{key}.{metric}"
+            recorder.results.append({"scale": recorder.scale, "name": name, "seconds": timings[metric],
+                                     "cpu_seconds": None, "peak_mb": None, "rows": None, "rows_per_sec": None})
+            print(f"  {name:<36} {timings[metric]:>9.4f}s")
+
+
+def run_benchmarks(scales: list, track_memory: bool = True, seed: int = 42, suites: list = ("data",),
+                   repeats: int = BENCH_REPEATS) -> dict:
+    """执行所选测试组：data为各规模合成数据上的数据处理/训练/预测/聚合，web为web1页面的启动与重跑耗时"""
+    results = []
+    if "web" in suites:
+        print("\n页面：web1.py（每个页面在独立进程中冷启动）")
+        recorder = BenchRecorder(0, track_memory=False)
+        bench_web_pages(recorder)
+        results.extend(recorder.results)
+    for scale in (scales if "data" in suites else []):
+        rows = parse_rows(scale)
+        print(f"\n规模：{rows}行（生成/复用合成数据...）")
+        csv_path = synthetic_csv(rows, seed)
+        recorder = BenchRecorder(rows, track_memory, repeats)
+        df = bench_data_stages(recorder, csv_path)
+        predictor = bench_training(recorder, csv_path, df)
+        bench_prediction(recorder, predictor, df)
+        bench_aggregations(recorder, df)
+        results.extend(recorder.results)
+        del df
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "seed": seed,
+            "track_memory": track_memory,
+            "repeats": repeats
+        },
+        "results": results
+    }
+
+
+# ---------------------- 5. 与基线比较 ----------------------
+def compare_results(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """按（规模，测试项）与基线比较，耗时（多次测量的最小值）或峰值内存增加超过threshold的记为回退"""
+    baseline_index = {(r["scale"], r["name"]): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        base = baseline_index.get((result["scale"], result["name"]))
+        if base is None:
+            continue
+        for metric, field in COMPARE_METRICS.items():
+            if field not in result or field not in base:
+                field = metric
+            current_value, base_value = result.get(field), base.get(field)
+            if current_value is None or not base_value:
+                continue
+            ratio = current_value / base_value
+            if ratio > 1 + threshold and current_value - base_value > MIN_REGRESSION_DELTA[metric]:
+                regressions.append({"scale": result["scale"], "name": result["name"], "metric": field,
+                                    "baseline": base_value, "current": current_value, "ratio": ratio})
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="数据处理、训练、预测与页面聚合的性能基准测试")
+    parser.add_argument("--scales", nargs="+", default=DEFAULT_SCALES, help="测试规模，如 10k 1m 10m")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="结果JSON输出路径")
+    parser.add_argument("--compare", default=None, help="基线结果JSON，给定时比较并标记性能回退")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="回退判定的相对阈值")
+    parser.add_argument("--repeats", type=int, default=BENCH_REPEATS, help="每个测试项的重复次数（取中位数与最小值）")
+    parser.add_argument("--no-memory", action="store_true", help="不统计峰值内存（减少测量开销）")
+    parser.add_argument("--seed", type=int, default=42, help="合成数据随机种子")
+    parser.add_argument("--suites", nargs="+", choices=["data", "web"], default=["data"],
+                        help="测试组：data（数据处理/训练/预测/聚合）、web（web1页面启动与重跑）")
+    args = parser.parse_args()
+
+    current = run_benchmarks(args.scales, track_memory=not args.no_memory, seed=args.seed, suites=args.suites,
+                             repeats=args.repeats)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(current, f, ensure_ascii=False, indent=2)
+    print(f"\n测试结果已保存为：{args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_results(current, baseline, args.threshold)
+        if regressions:
+            print(f"\n发现{len(regressions)}项性能回退（阈值{args.threshold:.0%}）：")
+            for r in regressions:
+                label = f"{r['scale']}行" if r["scale"] else "页面"
+                print(f"  [{label}] {r['name']} {r['metric']}: {r['baseline']:.4f} → {r['current']:.4f}（×{r['ratio']:.2f}）")
+            sys.exit(1)
+        print("\n与基线相比未发现性能回退")
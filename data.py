@@ -1,10 +1,26 @@
+import io
+import os
+import re
+import csv
+import glob
+import json
+import time
+import hashlib
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.csv as pa_csv
 import warnings
+from typing import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from atomic_file import atomic_path
+from instrument import stage
+from synth import GENDERS, MAJORS, FIRST_STUDENT_ID, SYNTHETIC_ATTR, generate_columns, synthetic_frame
 warnings.filterwarnings('ignore')
 
 # ---------------------- 1. 配置参数（根据实际CSV字段调整） ----------------------
-# 文件路径（需与CSV实际存放路径一致）
+# 文件路径（需与CSV实际存放路径一致；也可以是目录或通配符，如按学期/学院导出的多个CSV）
 FILE_PATH = "D:/streamlit_env/student_data_adjusted_rounded.csv"
 
 # 字段映射：CSV原字段名 → 代码内部标准化字段名（根据CSV实际字段修改）
@@ -13,134 +29,679 @@ FIELD_MAPPING = {
     "专业": "major",               # 专业名称
     "性别": "gender",              # 性别
     "每周学习时长（小时）": "study_hours",  # 每周学习时长
-    "上课出勤率": "attendance",    # 上课出勤率（%）
+    "上课出勤率": "attendance",    # 上课出勤率（比例，0~1）
     "期中考试分数": "midterm_score",  # 期中考试分数
-    "作业完成率": "homework_rate",  # 作业完成率（%）
+    "作业完成率": "homework_rate",  # 作业完成率（比例，0~1）
     "期末考试分数": "final_score"   # 期末考试分数（预测目标）
 }
 
+# 找不到数据文件时生成的模拟数据行数与随机种子
+MOCK_ROWS = 1000
+MOCK_SEED = 42
+
 # 核心字段列表（确保后续模块依赖字段不缺失）
 REQUIRED_FIELDS = list(FIELD_MAPPING.values())
+# 数值型/分类型字段（缺失值处理与类型转换共用）
+NUMERIC_FIELDS = ["study_hours", "attendance", "midterm_score", "homework_rate", "final_score"]
+CATEGORICAL_FIELDS = ["student_id", "major", "gender"]
+
+# 紧凑类型方案：分类字段用category，学号用Arrow字符串，特征用float32
+DTYPE_PLAN = {
+    "student_id": "string[pyarrow]",
+    "major": "category",
+    "gender": "category",
+    **{field: "float32" for field in NUMERIC_FIELDS}
+}
+# 读取CSV时按原字段名声明学号与分类字段的类型（解析阶段即生成紧凑列）；数值字段宽松解析，
+# 个别非数字单元格不会使读取失败，读取后转为缺失值并降为float32（见coerce_numeric_columns）
+READ_DTYPES = {raw_field: DTYPE_PLAN[field] for raw_field, field in FIELD_MAPPING.items() if field not in NUMERIC_FIELDS}
+
+# 列式缓存目录（清洗后的数据以Arrow/Feather格式缓存，热启动时内存映射读取）
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+# 缓存格式版本（清洗逻辑变化时递增，使旧缓存全部失效）
+CACHE_FORMAT_VERSION = 2
+# 多文件读取时记录来源文件的字段
+SOURCE_FILE_FIELD = "source_file"
 
 
 # ---------------------- 2. 数据加载（含路径容错，无侧边栏输出） ----------------------
+def normalize_column_name(col: str) -> str:
+    """清理原字段名（去除空格、特殊字符）"""
+    return col.strip().replace("\u3000", "").replace(" ", "")
+
+
+def coerce_numeric_columns(raw_df: pd.DataFrame) -> pd.DataFrame:
+    """原始数值字段中的非数字单元格转为缺失值（NaN），并降为float32（原地修改）"""
+    for col in raw_df.columns:
+        field = FIELD_MAPPING.get(normalize_column_name(col))
+        if field in NUMERIC_FIELDS and raw_df[col].dtype != DTYPE_PLAN[field]:
+            raw_df[col] = pd.to_numeric(raw_df[col], errors="coerce").astype(DTYPE_PLAN[field])
+    return raw_df
+
+
+def read_student_csv(file_path, **kwargs):
+    """按紧凑类型方案读取CSV，仅解析FIELD_MAPPING中的字段（分块读取时返回读取器，由调用方逐块调用coerce_numeric_columns）"""
+    result = pd.read_csv(
+        file_path,
+        encoding="utf-8",  # 支持中文编码
+        usecols=lambda col: normalize_column_name(col) in FIELD_MAPPING,
+        dtype=READ_DTYPES,
+        **kwargs
+    )
+    return coerce_numeric_columns(result) if isinstance(result, pd.DataFrame) else result
+
+
+def is_synthetic(df: pd.DataFrame) -> bool:
+    """数据是否来自（或含有）模拟数据：找不到数据文件时的模拟数据，或补充过核心字段的数据"""
+    return bool(df.attrs.get(SYNTHETIC_ATTR, False))
+
+
 def load_raw_data(file_path: str) -> pd.DataFrame:
-    """加载CSV原始数据，路径错误时生成模拟数据"""
+    """加载CSV原始数据，路径错误时生成模拟数据（结果带模拟数据标记，见is_synthetic）"""
     try:
-        # 读取CSV（支持中文编码）
-        raw_df = pd.read_csv(file_path, encoding="utf-8")
+        raw_df = read_student_csv(file_path)
         return raw_df
     except FileNotFoundError:
-        # 生成100条模拟数据，结构与真实数据一致
-        mock_data = {
-            "学号": [f"2024{str(i).zfill(4)}" for i in range(1, 101)],
-            "专业": np.random.choice(["信息系统", "计算机科学", "数据科学", "大数据管理", "人工智能"], 100),
-            "性别": np.random.choice(["男", "女"], 100, p=[0.52, 0.48]),
-            "每周学习时长（小时）": np.random.randint(5, 18, 100),
-            "上课出勤率": np.random.uniform(75, 98, 100).round(1),
-            "期中考试分数": np.random.randint(40, 90, 100),
-            "作业完成率": np.random.uniform(60, 100, 100).round(1),
-            "期末考试分数": np.random.randint(45, 95, 100)
-        }
-        return pd.DataFrame(mock_data)
+        # 生成模拟数据，字段与分布与真实数据一致（固定随机种子，结果可复现）
+        return synthetic_frame(MOCK_ROWS, seed=MOCK_SEED)
     except Exception as e:
         raise  # 抛出未知错误，便于调试
 
 
 # ---------------------- 3. 字段标准化（统一字段名，无侧边栏输出） ----------------------
 def standardize_fields(raw_df: pd.DataFrame) -> pd.DataFrame:
-    """将CSV原字段名标准化为统一字段名，删除无关字段"""
-    # 清理原字段名（去除空格、特殊字符）
-    raw_df.columns = [col.strip().replace("\u3000", "").replace(" ", "") for col in raw_df.columns]
+    """将CSV原字段名标准化为统一字段名，删除无关字段（原地修改，不复制数据）"""
+    raw_df.columns = [normalize_column_name(col) for col in raw_df.columns]
     
-    # 保留存在的核心字段，映射为标准化名称
-    existing_mapping = {f: FIELD_MAPPING[f] for f in FIELD_MAPPING.keys() if f in raw_df.columns}
-    standardized_df = raw_df[list(existing_mapping.keys())].rename(columns=existing_mapping)
+    # 删除无关字段，核心字段原地映射为标准化名称
+    unused_fields = [col for col in raw_df.columns if col not in FIELD_MAPPING]
+    if unused_fields:
+        raw_df.drop(columns=unused_fields, inplace=True)
+    raw_df.rename(columns=FIELD_MAPPING, inplace=True)
     
-    return standardized_df
+    return raw_df
 
 
 # ---------------------- 4. 缺失值处理（保证数据完整性，无侧边栏输出） ----------------------
-def handle_missing_values(standardized_df: pd.DataFrame) -> pd.DataFrame:
-    """数值型字段用均值填充，分类型字段用众数填充"""
-    clean_df = standardized_df.copy()
+def handle_missing_values(standardized_df: pd.DataFrame, fill_values: dict = None) -> pd.DataFrame:
+    """数值型字段用均值填充，分类型字段用众数填充（fill_values给定时使用外部的全局填充值；原地修改）"""
+    clean_df = standardized_df
+    values = {}
     
     # 数值型字段处理
-    numeric_fields = ["study_hours", "attendance", "midterm_score", "homework_rate", "final_score"]
-    for field in numeric_fields:
-        if field in clean_df.columns and clean_df[field].isnull().sum() > 0:
-            clean_df[field].fillna(clean_df[field].mean(), inplace=True)
+    for field in NUMERIC_FIELDS:
+        if field in clean_df.columns and clean_df[field].isnull().any():
+            values[field] = fill_values[field] if fill_values and field in fill_values else clean_df[field].mean()
     
     # 分类型字段处理
-    categorical_fields = ["student_id", "major", "gender"]
-    for field in categorical_fields:
-        if field in clean_df.columns and clean_df[field].isnull().sum() > 0:
-            clean_df[field].fillna(clean_df[field].mode()[0], inplace=True)
+    for field in CATEGORICAL_FIELDS:
+        if field in clean_df.columns and clean_df[field].isnull().any():
+            value = fill_values[field] if fill_values and field in fill_values else clean_df[field].mode()[0]
+            # 全局众数可能不在当前块的类别中，需先加入类别
+            if isinstance(clean_df[field].dtype, pd.CategoricalDtype) and value not in clean_df[field].cat.categories:
+                clean_df[field] = clean_df[field].cat.add_categories([value])
+            values[field] = value
     
+    if values:
+        clean_df.fillna(values, inplace=True)
     return clean_df
 
 
 # ---------------------- 5. 补充缺失核心字段（无侧边栏输出） ----------------------
-def supplement_required_fields(clean_df: pd.DataFrame) -> pd.DataFrame:
-    """补充缺失的核心字段，用合理模拟数据填充"""
-    full_df = clean_df.copy()
+def supplement_required_fields(clean_df: pd.DataFrame, row_offset: int = 0) -> pd.DataFrame:
+    """补充缺失的核心字段（row_offset为分块处理时本块首行的全局行号；原地修改）
+
+    学号按行号生成；其余字段用synth.py按真实数据分布生成的模拟值填充，并标记为模拟数据（不用于保存模型）
+    """
+    full_df = clean_df
     data_size = len(full_df)
-    
-    for field in REQUIRED_FIELDS:
-        if field not in full_df.columns:
-            if field == "student_id":
-                full_df[field] = [f"2024{str(i).zfill(4)}" for i in range(1, data_size + 1)]
-            elif field == "major":
-                full_df[field] = np.random.choice(["信息系统", "计算机科学", "数据科学", "大数据管理", "人工智能"], data_size)
-            elif field == "gender":
-                full_df[field] = np.random.choice(["男", "女"], data_size, p=[0.52, 0.48])
-            elif field == "study_hours":
-                full_df[field] = np.random.randint(5, 18, data_size).astype(float)
-            elif field in ["attendance", "homework_rate"]:
-                full_df[field] = np.random.uniform(70, 100, data_size).round(1).astype(float)
-            elif field in ["midterm_score", "final_score"]:
-                full_df[field] = np.random.randint(30, 100, data_size).astype(float)
+    missing = [field for field in REQUIRED_FIELDS if field not in full_df.columns]
+    if not missing:
+        return full_df
+
+    columns = generate_columns(np.random.default_rng([MOCK_SEED, row_offset]), data_size)
+    for field in missing:
+        if field == "student_id":
+            full_df[field] = np.arange(FIRST_STUDENT_ID + row_offset, FIRST_STUDENT_ID + row_offset + data_size).astype(str)
+        elif field in ["major", "gender"]:
+            labels = np.array(MAJORS if field == "major" else GENDERS)
+            full_df[field] = labels[columns[field]]
+        else:
+            full_df[field] = columns[field]
+    if missing != ["student_id"]:
+        full_df.attrs[SYNTHETIC_ATTR] = True
     
     return full_df
 
 
 # ---------------------- 6. 数据类型转换（适配建模/可视化，无侧边栏输出） ----------------------
-def convert_data_types(full_df: pd.DataFrame) -> pd.DataFrame:
-    """统一数据类型：数值型转float，分类型转str"""
-    final_df = full_df.copy()
+def convert_data_types(full_df: pd.DataFrame, categories: dict = None) -> pd.DataFrame:
+    """按DTYPE_PLAN统一数据类型：数值型转float32，专业/性别转category，学号转字符串（已是目标类型的列不再转换）"""
+    final_df = full_df
     
-    # 数值型字段转float
-    numeric_fields = ["study_hours", "attendance", "midterm_score", "homework_rate", "final_score"]
-    for field in numeric_fields:
-        if field in final_df.columns:
-            final_df[field] = pd.to_numeric(final_df[field], errors="coerce").astype(float)
+    # 数值型字段转float32
+    for field in NUMERIC_FIELDS:
+        if field in final_df.columns and final_df[field].dtype != DTYPE_PLAN[field]:
+            final_df[field] = pd.to_numeric(final_df[field], errors="coerce").astype(DTYPE_PLAN[field])
     
-    # 分类型字段转str
-    categorical_fields = ["student_id", "major", "gender"]
-    for field in categorical_fields:
-        if field in final_df.columns:
-            final_df[field] = final_df[field].astype(str)
+    # 分类型字段转category/字符串（categories给定时统一类别，保证分块结果可直接拼接）
+    for field in CATEGORICAL_FIELDS:
+        if field not in final_df.columns:
+            continue
+        if categories and field in categories:
+            column = final_df[field] if isinstance(final_df[field].dtype, pd.CategoricalDtype) else final_df[field].astype(str)
+            final_df[field] = column.astype(pd.CategoricalDtype(categories[field]))
+        elif final_df[field].dtype != DTYPE_PLAN[field]:
+            final_df[field] = final_df[field].astype(str).astype(DTYPE_PLAN[field])
     
     return final_df
 
 
-# ---------------------- 7. 数据处理主函数（外部模块调用入口） ----------------------
-def process_student_data() -> pd.DataFrame:
-    """完整数据处理流程：加载→标准化→缺失值处理→补充字段→类型转换"""
-    raw_df = load_raw_data(FILE_PATH)
-    standardized_df = standardize_fields(raw_df)
-    clean_df = handle_missing_values(standardized_df)
-    full_df = supplement_required_fields(clean_df)
-    final_df = convert_data_types(full_df)
+def bytes_per_row(df: pd.DataFrame) -> float:
+    """数据框平均每行占用的内存字节数（含字符串对象本身）"""
+    return df.memory_usage(deep=True, index=False).sum() / max(len(df), 1)
+
+
+def legacy_bytes_per_row(df: pd.DataFrame) -> float:
+    """按旧类型方案（float64 + Python字符串对象）折算的每行内存字节数，用于对比"""
+    legacy_types = {field: "float64" for field in NUMERIC_FIELDS if field in df.columns}
+    legacy_types.update({field: object for field in CATEGORICAL_FIELDS if field in df.columns})
+    return bytes_per_row(df.astype(legacy_types))
+
+
+# ---------------------- 7. 流式分块处理（大文件内存受限场景） ----------------------
+# 流式处理默认内存上限（MB）
+DEFAULT_MAX_MEMORY_MB = 256
+
+
+def _rewind(file_path) -> None:
+    """文件对象（如上传的CSV）在每一遍读取前回到开头"""
+    if hasattr(file_path, "seek"):
+        file_path.seek(0)
+
+
+def estimate_chunksize(file_path, max_memory_mb: float = DEFAULT_MAX_MEMORY_MB) -> int:
+    """按内存上限估算每块行数：读取样本行测算单行内存占用"""
+    _rewind(file_path)
+    sample = read_student_csv(file_path, nrows=1000)
+    bytes_per_row = max(sample.memory_usage(deep=True).sum() / max(len(sample), 1), 1)
+    # 单块清洗过程中同时存在原始块、清洗中间结果与输出块，按4倍瞬时占用预留
+    return max(1000, int(max_memory_mb * 1024 * 1024 / (bytes_per_row * 4)))
+
+
+def load_raw_data_chunks(file_path, chunksize: int) -> Iterator[pd.DataFrame]:
+    """分块读取CSV原始数据，每次产出chunksize行"""
+    _rewind(file_path)
+    with read_student_csv(file_path, chunksize=chunksize) as reader:
+        for raw_chunk in reader:
+            yield coerce_numeric_columns(raw_chunk)
+
+
+def compute_global_stats(sources: list, chunksize: int):
+    """第一遍流式扫描（sources为一个或多个文件路径/文件对象）：累加数值字段的和与计数、分类字段的频数，返回（全局填充值，分类字段全部类别）"""
+    sums = {field: 0.0 for field in NUMERIC_FIELDS}
+    counts = {field: 0 for field in NUMERIC_FIELDS}
+    # 学号几乎各不相同，全局频数表与数据量同阶，不在内存受限的流式扫描中统计（缺失时按块内众数填充）
+    frequencies = {field: None for field in CATEGORICAL_FIELDS if field != "student_id"}
+
+    for source in sources:
+        for raw_chunk in load_raw_data_chunks(source, chunksize):
+            standardized_chunk = standardize_fields(raw_chunk)
+            for field in NUMERIC_FIELDS:
+                if field in standardized_chunk.columns:
+                    values = pd.to_numeric(standardized_chunk[field], errors="coerce")
+                    sums[field] += values.sum()
+                    counts[field] += values.count()
+            for field in frequencies:
+                if field in standardized_chunk.columns:
+                    chunk_counts = standardized_chunk[field].value_counts()
+                    chunk_counts = chunk_counts[chunk_counts > 0]
+                    chunk_counts.index = chunk_counts.index.astype(str)
+                    previous = frequencies[field]
+                    frequencies[field] = chunk_counts if previous is None else previous.add(chunk_counts, fill_value=0)
+
+    fill_values = {}
+    for field in NUMERIC_FIELDS:
+        if counts[field] > 0:
+            fill_values[field] = sums[field] / counts[field]
+    categories = {}
+    for field, field_counts in frequencies.items():
+        if field_counts is not None and len(field_counts) > 0:
+            field_counts = field_counts.sort_index()
+            # 与Series.mode()一致：频数相同时取排序最小的取值
+            fill_values[field] = field_counts.idxmax()
+            categories[field] = list(field_counts.index)
+    return fill_values, categories
+
+
+def check_required_fields(file_path, required_fields) -> None:
+    """读取表头并标准化字段名，缺少required_fields中的任一字段时报错（不生成任何补充数据）"""
+    _rewind(file_path)
+    columns = standardize_fields(read_student_csv(file_path, nrows=0)).columns
+    missing = [field for field in required_fields if field not in columns]
+    if missing:
+        raise ValueError(f"缺少字段：{', '.join(missing)}")
+
+
+def iter_processed_chunks(file_path=None, max_memory_mb: float = DEFAULT_MAX_MEMORY_MB,
+                          chunksize: int = None, required_fields=None) -> Iterator[pd.DataFrame]:
+    """两遍流式处理：第一遍计算全局填充值，第二遍逐块执行 标准化→缺失值处理→类型转换
+
+    用于批量预测与增量训练：文件不存在时报错，缺少required_fields时报错；缺失的字段不做补充（不生成模拟数据）。
+    目录/通配符数据源逐个文件流式读取（全局填充值与类别跨文件统计），各块附加来源文件列
+    """
+    file_path = FILE_PATH if file_path is None else file_path
+    multi_source = is_multi_source(file_path)
+    if multi_source:
+        sources = resolve_source_files(file_path)
+        if not sources:
+            raise FileNotFoundError(f"未找到CSV文件：{file_path}")
+    elif isinstance(file_path, str) and not os.path.exists(file_path):
+        raise FileNotFoundError(f"数据文件不存在：{file_path}")
+    else:
+        sources = [file_path]
+    if required_fields and multi_source:
+        for source in sources:
+            try:
+                check_required_fields(source, required_fields)
+            except ValueError as e:
+                raise ValueError(f"{os.path.basename(source)}：{e}")
+    elif required_fields:
+        check_required_fields(file_path, required_fields)
+
+    if chunksize is None:
+        chunksize = estimate_chunksize(sources[0], max_memory_mb)
+    fill_values, categories = compute_global_stats(sources, chunksize)
+    if multi_source:
+        categories[SOURCE_FILE_FIELD] = [os.path.basename(source) for source in sources]
+
+    for source in sources:
+        for raw_chunk in load_raw_data_chunks(source, chunksize):
+            standardized_chunk = standardize_fields(raw_chunk)
+            clean_chunk = handle_missing_values(standardized_chunk, fill_values)
+            chunk = convert_data_types(clean_chunk, categories)
+            if multi_source:
+                chunk[SOURCE_FILE_FIELD] = pd.Categorical([os.path.basename(source)] * len(chunk),
+                                                          categories=categories[SOURCE_FILE_FIELD])
+            yield chunk
+
+
+# ---------------------- 8. 追加行增量读取（只解析新增的尾部） ----------------------
+# 按块读取原始字节时每块的长度（求已读区间的指纹、查找最后一个完整行）
+READ_BLOCK_BYTES = 1024 * 1024
+
+
+class ByteRangeReader(io.RawIOBase):
+    """只读取文件[start, end)区间的可回退读取器，可在前面拼接prefix（如表头行）"""
+
+    def __init__(self, file_path: str, start: int, end: int, prefix: bytes = b""):
+        self._file = open(file_path, "rb")
+        self._start = start
+        self._prefix = prefix
+        self._size = len(prefix) + max(end - start, 0)
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._size}[whence]
+        self._pos = min(max(base + offset, 0), self._size)
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        n = min(len(buffer), self._size - self._pos)
+        if n <= 0:
+            return 0
+        prefix_part = self._prefix[self._pos:self._pos + n]
+        buffer[:len(prefix_part)] = prefix_part
+        filled = len(prefix_part)
+        if filled < n:
+            self._file.seek(self._start + self._pos + filled - len(self._prefix))
+            chunk = self._file.read(n - filled)
+            buffer[filled:filled + len(chunk)] = chunk
+            filled += len(chunk)
+        self._pos += filled
+        return filled
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+def complete_lines_end(file_path: str) -> int:
+    """返回文件中最后一个完整行（以换行结尾）之后的字节位置，忽略正在写入的半行"""
+    size = os.path.getsize(file_path)
+    with open(file_path, "rb") as f:
+        pos = size
+        while pos > 0:
+            step = min(READ_BLOCK_BYTES, pos)
+            f.seek(pos - step)
+            block = f.read(step)
+            newline = block.rfind(b"\n")
+            if newline >= 0:
+                return pos - step + newline + 1
+            pos -= step
+    return 0
+
+
+def header_end(file_path: str) -> int:
+    """表头行之后的字节位置（首条数据行的起点）"""
+    with open(file_path, "rb") as f:
+        f.readline()
+        return f.tell()
+
+
+def hash_byte_range(file_path: str, start: int, end: int, digest=None):
+    """将文件[start, end)区间的原始字节逐块送入digest（默认新建sha1），只读字节不解析；返回digest
+
+    传入[0, start)的digest时可续算出[0, end)的指纹，追加行后无需重新读取已读区间
+    """
+    digest = hashlib.sha1() if digest is None else digest
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(READ_BLOCK_BYTES, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest
+
+
+def prefix_fingerprint(file_path: str, end: int) -> str:
+    """文件[0, end)区间全部字节的指纹：已读区间内任意一行被改写（即使字节数不变）指纹都会变化"""
+    return hash_byte_range(file_path, 0, end).hexdigest()
+
+
+def open_byte_range(file_path: str, start: int, end: int) -> io.BufferedReader:
+    """打开文件[start, end)区间用于CSV解析；start不在文件开头时自动拼接表头行"""
+    header = b""
+    if start > 0:
+        with open(file_path, "rb") as f:
+            header = f.readline()
+    return io.BufferedReader(ByteRangeReader(file_path, start, end, prefix=header))
+
+
+def iter_appended_chunks(file_path: str, start: int, end: int, chunksize: int,
+                         fill_values: dict = None, row_offset: int = 0) -> Iterator[pd.DataFrame]:
+    """仅解析[start, end)区间内新增的行，按给定的全局填充值逐块完成清洗"""
+    if end <= start:
+        return
+    with open_byte_range(file_path, start, end) as reader:
+        for raw_chunk in load_raw_data_chunks(reader, chunksize):
+            standardized_chunk = standardize_fields(raw_chunk)
+            clean_chunk = handle_missing_values(standardized_chunk, fill_values)
+            full_chunk = supplement_required_fields(clean_chunk, row_offset)
+            row_offset += len(full_chunk)
+            yield convert_data_types(full_chunk)
+
+
+# ---------------------- 9. 多文件并行读取（目录/通配符） ----------------------
+# Arrow读取时各字段的列类型（专业/性别按字典编码读取，转换后即为category）
+ARROW_READ_TYPES = {
+    "student_id": pa.string(),
+    "major": pa.dictionary(pa.int32(), pa.string()),
+    "gender": pa.dictionary(pa.int32(), pa.string()),
+    **{field: pa.float32() for field in NUMERIC_FIELDS}
+}
+
+
+def is_multi_source(file_path) -> bool:
+    """数据源是否为目录或通配符（多个CSV）"""
+    return isinstance(file_path, str) and (os.path.isdir(file_path) or glob.has_magic(file_path))
+
+
+def resolve_source_files(file_path) -> list:
+    """展开数据源：目录取其中全部CSV，通配符按模式匹配，单个文件原样返回（均按路径排序；不存在时为空列表）"""
+    if os.path.isdir(file_path):
+        return sorted(glob.glob(os.path.join(file_path, "*.csv")))
+    if glob.has_magic(file_path):
+        return sorted(path for path in glob.glob(file_path) if os.path.isfile(path))
+    return [file_path] if os.path.isfile(file_path) else []
+
+
+def validate_source_columns(file_path: str) -> dict:
+    """按FIELD_MAPPING校验CSV表头，返回 原始列名 → 标准化字段名；缺少字段时报错"""
+    with open(file_path, encoding="utf-8-sig", newline="") as f:
+        header = next(csv.reader(f), [])
+    columns = {raw: FIELD_MAPPING[normalize_column_name(raw)] for raw in header if normalize_column_name(raw) in FIELD_MAPPING}
+    missing = [raw for raw, field in FIELD_MAPPING.items() if field not in columns.values()]
+    if missing:
+        raise ValueError(f"缺少字段：{missing}")
+    return columns
+
+
+def read_source_file(file_path: str) -> pa.Table:
+    """用Arrow多线程CSV引擎读取单个文件：只解析FIELD_MAPPING中的字段，按紧凑类型解析，并附加来源文件列
+
+    各文件表头的列顺序可能不同，重命名后按REQUIRED_FIELDS固定列顺序，保证各文件的表结构一致、可直接拼接
+    """
+    columns = validate_source_columns(file_path)
+
+    def read(column_types):
+        return pa_csv.read_csv(
+            file_path,
+            read_options=pa_csv.ReadOptions(use_threads=True),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=list(columns),
+                column_types={raw: column_types[field] for raw, field in columns.items()},
+                strings_can_be_null=True
+            )
+        )
+    try:
+        table = read(ARROW_READ_TYPES)
+    except pa.ArrowInvalid:
+        # 数值字段含非数字单元格：数值字段按字符串重新读取，非数字单元格转为空值（与单文件读取一致）
+        table = read({**ARROW_READ_TYPES, **{field: pa.string() for field in NUMERIC_FIELDS}})
+        for raw, field in columns.items():
+            if field in NUMERIC_FIELDS:
+                values = pd.to_numeric(table[raw].to_pandas(), errors="coerce").astype(DTYPE_PLAN[field])
+                table = table.set_column(table.column_names.index(raw), raw, pa.array(values, type=pa.float32()))
+    table = table.rename_columns([columns[name] for name in table.column_names]).select(REQUIRED_FIELDS)
+    # 来源文件列为字典编码：每行只存一个整数下标
+    source = pa.DictionaryArray.from_arrays(pa.array(np.zeros(table.num_rows, dtype=np.int32)),
+                                            pa.array([os.path.basename(file_path)]))
+    return table.append_column(SOURCE_FILE_FIELD, source)
+
+
+def read_source_files(file_path, max_workers: int = None) -> tuple:
+    """并发读取数据源下的全部CSV，零拷贝拼接为一个Arrow表；返回（表，每个文件的行数/耗时/错误报告）"""
+    files = resolve_source_files(file_path)
+    if not files:
+        raise FileNotFoundError(f"未找到CSV文件：{file_path}")
+
+    def timed_read(path):
+        start = time.perf_counter()
+        try:
+            table, error = read_source_file(path), None
+        except (ValueError, pa.ArrowException) as e:  # ArrowInvalid等解析错误
+            table, error = None, str(e)
+        return path, table, time.perf_counter() - start, error
+
+    tables, report = [], []
+    with ThreadPoolExecutor(max_workers=max_workers or min(len(files), os.cpu_count() or 1)) as pool:
+        for path, table, seconds, error in pool.map(timed_read, files):
+            report.append({"file": path, "rows": 0 if table is None else table.num_rows,
+                           "seconds": seconds, "error": error})
+            if table is not None:
+                tables.append(table)
+
+    failed = [f"{os.path.basename(item['file'])}：{item['error']}" for item in report if item["error"]]
+    if failed:
+        raise ValueError("以下文件读取失败：\n" + "\n".join(failed))
+    # concat_tables只拼接各文件的列块，不复制数据
+    return pa.concat_tables(tables), report
+
+
+def load_multi_source(file_path, max_workers: int = None) -> tuple:
+    """多文件数据源的完整处理：并发读取 → 转为DataFrame → 缺失值处理 → 类型转换；返回（数据，读取报告）"""
+    with stage("data.read_source_files") as s:
+        table, report = read_source_files(file_path, max_workers)
+        s.rows = table.num_rows
+    with stage("data.to_pandas", table.num_rows):
+        # 按列拆块转换：无缺失的数值列直接引用Arrow缓冲区，字典编码列转为category
+        string_types = {pa.string(): pd.StringDtype("pyarrow")}
+        df = table.to_pandas(split_blocks=True, self_destruct=True, types_mapper=string_types.get)
+        del table
+    with stage("data.handle_missing_values", len(df)):
+        clean_df = handle_missing_values(df)
+    with stage("data.convert_data_types", len(clean_df)):
+        final_df = convert_data_types(clean_df)
+    return final_df, report
+
+
+# ---------------------- 10. 列式缓存（按数据版本自动失效） ----------------------
+def data_version(file_path: str):
+    """根据源文件路径、大小、修改时间及FIELD_MAPPING生成数据版本号（目录/通配符时包含每个文件）；文件不存在时返回None"""
+    if is_multi_source(file_path):
+        files = resolve_source_files(file_path)
+        if not files:
+            return None
+        try:
+            stats = [os.stat(path) for path in files]
+        except OSError:
+            return None
+        source = {
+            "source": os.path.abspath(file_path),
+            "files": [[os.path.abspath(path), stat.st_size, stat.st_mtime_ns] for path, stat in zip(files, stats)]
+        }
+    else:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        source = {"path": os.path.abspath(file_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    key = json.dumps({
+        **source,
+        "mapping": FIELD_MAPPING,
+        "format": CACHE_FORMAT_VERSION
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def source_key(file_path: str) -> str:
+    """数据源绝对路径的短哈希：不同目录下的同名文件各自使用独立的缓存与索引文件"""
+    return hashlib.sha1(os.path.abspath(file_path).encode("utf-8")).hexdigest()[:8]
+
+
+def cache_path(file_path: str, version: str) -> str:
+    """返回某数据版本对应的缓存文件路径（目录/通配符数据源以目录名与模式命名，附带源路径哈希）"""
+    if is_multi_source(file_path):
+        path = os.path.normpath(file_path)
+        name = os.path.basename(path) if os.path.isdir(path) else f"{os.path.basename(os.path.dirname(path))}_{os.path.basename(path)}"
+        stem = re.sub(r"[^\w\-]+", "_", name).strip("_") or "sources"
+    else:
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(CACHE_DIR, f"{stem}-{source_key(file_path)}-{version}.arrow")
+
+
+def load_cached_frame(file_path: str, version: str):
+    """内存映射读取缓存的清洗结果，缓存不存在或损坏时返回None"""
+    path = cache_path(file_path, version)
+    if not os.path.exists(path):
+        return None
+    try:
+        table = feather.read_table(path, memory_map=True)
+    except Exception:
+        return None
+    # 字符串列映射回Arrow字符串类型，数值列按列拆块以直接引用内存映射缓冲区
+    string_types = {pa.string(): pd.StringDtype("pyarrow"), pa.large_string(): pd.StringDtype("pyarrow")}
+    return table.to_pandas(split_blocks=True, types_mapper=string_types.get)
+
+
+def save_cached_frame(final_df: pd.DataFrame, file_path: str, version: str) -> str:
+    """将清洗结果写入缓存（不压缩以支持内存映射），并清理同一源文件的旧版本缓存"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = cache_path(file_path, version)
+    with atomic_path(path) as tmp_path:  # 原子替换，并发读取方不会看到写了一半的文件
+        feather.write_feather(final_df.reset_index(drop=True), tmp_path, compression="uncompressed")
+
+    # 删除同一数据源的旧版本缓存（文件名前缀含源路径哈希，不会误删其他目录下同名文件的缓存）
+    prefix = path[:-len(f"{version}.arrow")]
+    remove_stale_files(f"{glob.escape(prefix)}*.arrow", keep=[path])
+    return path
+
+
+def remove_stale_files(pattern: str, keep: list) -> None:
+    """删除匹配pattern（glob）且不在keep中的文件，用于清理同一数据源的旧版本缓存/索引/聚合表；文件正被占用等删除失败时忽略"""
+    for stale in glob.glob(pattern):
+        if stale not in keep:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+# ---------------------- 11. 数据处理主函数（外部模块调用入口） ----------------------
+def process_student_data(use_cache: bool = True) -> pd.DataFrame:
+    """完整数据处理流程：加载→标准化→缺失值处理→补充字段→类型转换（命中缓存时直接读取缓存；各阶段可选计时）
+
+    结果含模拟数据（数据文件不存在或补充过核心字段）时带有模拟数据标记，调用方用is_synthetic()判断
+    """
+    # 源文件存在时才使用缓存（模拟数据按固定种子生成；含补充字段的数据不缓存，以免缓存中丢失模拟数据标记）
+    version = data_version(FILE_PATH) if use_cache else None
+    if version is not None:
+        with stage("data.load_cached_frame") as s:
+            cached_df = load_cached_frame(FILE_PATH, version)
+            s.rows = None if cached_df is None else len(cached_df)
+        if cached_df is not None:
+            return cached_df
+
+    if is_multi_source(FILE_PATH):
+        final_df, _ = load_multi_source(FILE_PATH)
+        if version is not None:
+            with stage("data.save_cached_frame", len(final_df)):
+                save_cached_frame(final_df, FILE_PATH, version)
+        return final_df
+
+    with stage("data.load_raw_data") as s:
+        raw_df = load_raw_data(FILE_PATH)
+        s.rows = len(raw_df)
+    with stage("data.standardize_fields", len(raw_df)):
+        standardized_df = standardize_fields(raw_df)
+    with stage("data.handle_missing_values", len(standardized_df)):
+        clean_df = handle_missing_values(standardized_df)
+    with stage("data.supplement_required_fields", len(clean_df)):
+        full_df = supplement_required_fields(clean_df)
+    with stage("data.convert_data_types", len(full_df)):
+        final_df = convert_data_types(full_df)
+
+    if version is not None and not is_synthetic(final_df):
+        with stage("data.save_cached_frame", len(final_df)):
+            save_cached_frame(final_df, FILE_PATH, version)
     
     return final_df
 
 
-# ---------------------- 8. 测试代码（单独运行时验证，无侧边栏输出） ----------------------
+# ---------------------- 12. 测试代码（单独运行时验证，无侧边栏输出） ----------------------
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="学生数据处理")
+    parser.add_argument("--data", default=None, help="CSV路径、目录或通配符（默认使用FILE_PATH）")
+    parser.add_argument("--workers", type=int, default=None, help="多文件并发读取的线程数")
+    args = parser.parse_args()
+    if args.data:
+        FILE_PATH = args.data
+
+    # 多文件数据源：逐个文件报告行数与读取耗时，便于发现异常缓慢或格式错误的导出文件
+    if is_multi_source(FILE_PATH):
+        _, report = read_source_files(FILE_PATH, args.workers)
+        for item in report:
+            print(f"{os.path.basename(item['file'])}：{item['rows']}行，{item['seconds'] * 1000:.1f}ms")
+
     # 执行数据处理并打印结果（无Streamlit界面输出）
     processed_data = process_student_data()
     print("数据处理完成，前5条数据预览：")
     print(processed_data.head())
     print(f"\n数据规模：{processed_data.shape[0]}行 × {processed_data.shape[1]}列")
     print(f"核心字段：{list(processed_data.columns)}")
+    print(f"内存占用：{legacy_bytes_per_row(processed_data):.1f} 字节/行（float64+object） → "
+          f"{bytes_per_row(processed_data):.1f} 字节/行（紧凑类型）")
@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+
+import data
+from atomic_file import atomic_path
+from linear_predictor import FEATURE_COLS
+
+# ---------------------- 1. 配置参数 ----------------------
+# 共享特征库目录：每个数据版本一个子目录，CURRENT文件指向当前版本
+FEATURE_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".feature_store")
+# 数值矩阵的列（特征 + 预测目标）
+NUMERIC_COLS = [*FEATURE_COLS, "final_score"]
+# 编码存储的分类字段
+CATEGORICAL_COLS = ["major", "gender"]
+# 保留的历史版本数（仍被旧进程映射的版本不会立刻删除）
+KEEP_VERSIONS = 2
+
+
+# ---------------------- 2. 发布（写入内存映射数组 + 清单） ----------------------
+def publish_feature_store(df: pd.DataFrame = None, store_dir: str = FEATURE_STORE_DIR) -> str:
+    """将清洗后的数值特征矩阵与分类编码写成.npy数组，附带manifest.json，并原子切换CURRENT指针；返回版本号"""
+    df = data.process_student_data() if df is None else df
+    numeric = np.asfortranarray(df[NUMERIC_COLS].to_numpy(dtype=np.float32))  # 列优先存储，按列读取时连续
+    categoricals = {col: pd.Categorical(df[col].astype(str)) for col in CATEGORICAL_COLS}
+
+    version = data.data_version(data.FILE_PATH)
+    if version is None:
+        version = hashlib.sha1(numeric.tobytes()).hexdigest()[:16]
+    version_dir = os.path.join(store_dir, version)
+    # 版本目录整体就位后再切换CURRENT指针，读取方不会看到写了一半的数据；该版本已发布时直接切换
+    if not os.path.exists(version_dir):
+        with atomic_path(version_dir) as tmp_dir:
+            os.makedirs(tmp_dir)
+            np.save(os.path.join(tmp_dir, "numeric.npy"), numeric)
+            for col, values in categoricals.items():
+                np.save(os.path.join(tmp_dir, f"{col}_codes.npy"), values.codes)  # pandas按类别数选用最小整数类型
+            manifest = {
+                "version": version,
+                "rows": len(df),
+                "numeric_columns": NUMERIC_COLS,
+                "categories": {col: list(values.categories) for col, values in categoricals.items()},
+                "synthetic": data.is_synthetic(df),  # 模拟数据发布的特征库不用于保存模型
+                "created": time.strftime("%Y-%m-%d %H:%M:%S")
+            }
+            with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+    with atomic_path(os.path.join(store_dir, "CURRENT")) as pointer_tmp:
+        with open(pointer_tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+
+    # 清理过旧的版本
+    versions = sorted((d for d in os.listdir(store_dir) if os.path.isdir(os.path.join(store_dir, d)) and not d.endswith(".tmp")),
+                      key=lambda d: os.path.getmtime(os.path.join(store_dir, d)), reverse=True)
+    for stale in versions[KEEP_VERSIONS:]:
+        if stale != version:
+            shutil.rmtree(os.path.join(store_dir, stale), ignore_errors=True)
+    return version
+
+
+# ---------------------- 3. 只读挂载 ----------------------
+class FeatureStore:
+    """只读挂载的特征库：数组均为内存映射，多个进程共享同一份物理内存"""
+
+    def __init__(self, version_dir: str):
+        with open(os.path.join(version_dir, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.version = self.manifest["version"]
+        self.numeric = np.load(os.path.join(version_dir, "numeric.npy"), mmap_mode="r")
+        self.codes = {col: np.load(os.path.join(version_dir, f"{col}_codes.npy"), mmap_mode="r")
+                      for col in self.manifest["categories"]}
+
+    def __len__(self) -> int:
+        return self.manifest["rows"]
+
+    @property
+    def X(self) -> np.ndarray:
+        """特征矩阵（内存映射视图，不复制）"""
+        return self.numeric[:, :len(FEATURE_COLS)]
+
+    @property
+    def y(self) -> np.ndarray:
+        """预测目标（期末成绩）"""
+        return self.numeric[:, NUMERIC_COLS.index("final_score")]
+
+    def frame(self) -> pd.DataFrame:
+        """以内存映射数组为底层数据构造DataFrame（数值列与分类编码均不复制）"""
+        numeric = pd.DataFrame(self.numeric, columns=self.manifest["numeric_columns"], copy=False)
+        # 注意：df[col] = ... 赋值会复制分类编码，这里先构造分类列再整体拼接
+        categorical = pd.DataFrame({
+            col: pd.Categorical.from_codes(self.codes[col], dtype=pd.CategoricalDtype(categories), validate=False)
+            for col, categories in self.manifest["categories"].items()
+        }, copy=False)
+        frame = pd.concat([numeric, categorical], axis=1, copy=False)
+        frame.attrs[data.SYNTHETIC_ATTR] = self.manifest.get("synthetic", False)
+        return frame
+
+
+def current_version(store_dir: str = FEATURE_STORE_DIR):
+    """当前发布的版本号，尚未发布时返回None"""
+    try:
+        with open(os.path.join(store_dir, "CURRENT"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def attach_feature_store(store_dir: str = FEATURE_STORE_DIR, version: str = None):
+    """只读挂载当前（或指定）版本的特征库，尚未发布时返回None"""
+    version = current_version(store_dir) if version is None else version
+    if version is None:
+        return None
+    return FeatureStore(os.path.join(store_dir, version))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="发布/查看共享内存映射特征库")
+    parser.add_argument("command", choices=["publish", "info"])
+    parser.add_argument("--data", default=None, help="学生数据CSV路径（默认使用data.py中的FILE_PATH）")
+    parser.add_argument("--store-dir", default=FEATURE_STORE_DIR)
+    args = parser.parse_args()
+
+    if args.data:
+        data.FILE_PATH = args.data
+    if args.command == "publish":
+        version = publish_feature_store(store_dir=args.store_dir)
+        print(f"特征库已发布：版本{version}，目录{os.path.join(args.store_dir, version)}")
+    store = attach_feature_store(args.store_dir)
+    if store is None:
+        print("特征库尚未发布")
+    else:
+        print(f"当前版本：{store.version}，{len(store)}行，发布时间{store.manifest['created']}")
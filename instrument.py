@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import logging
+import threading
+import tracemalloc
+from collections import deque
+
+# ---------------------- 1. 配置参数 ----------------------
+# 环境变量 STUDENT_DIAGNOSTICS=1 时默认开启计时（也可在运行时调用enable()）
+_enabled = os.environ.get("STUDENT_DIAGNOSTICS") == "1"
+# 最近的阶段记录（只保留最新的若干条，避免长期运行时无限增长）
+_records = deque(maxlen=500)
+# 结构化日志：每个阶段结束时输出一条JSON记录
+logger = logging.getLogger("student.instrument")
+# 线程级开关与会话标记：Streamlit每个会话的脚本在各自线程中运行，诊断视图只对开启它的会话计时，
+# 记录带上会话标记，各会话只查看、清空自己的记录
+_thread_state = threading.local()
+# 正在进行的阶段（所有线程）与tracemalloc引用计数：tracemalloc是进程级的，需统一协调启停与峰值重置
+_lock = threading.Lock()
+_open_stages = []
+_tracing_refs = 0
+_owns_tracing = False
+
+
+def enable(flag: bool = True) -> None:
+    """开启/关闭阶段计时（整个进程）"""
+    global _enabled
+    _enabled = flag
+
+
+def enable_for_thread(flag: bool = True, session: str = None) -> None:
+    """开启/关闭当前线程的阶段计时（如只对带 ?diag=1 的Streamlit会话计时，不影响其他会话）；session为记录的会话标记"""
+    _thread_state.enabled = flag
+    _thread_state.session = session if flag else None
+
+
+def is_enabled() -> bool:
+    return _enabled or getattr(_thread_state, "enabled", False)
+
+
+# ---------------------- 2. 阶段计时 ----------------------
+class _NoopStage:
+    """关闭计时时使用的空上下文（共享单例，进入/退出无任何测量开销）"""
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_STAGE = _NoopStage()
+
+
+def _sample_peak() -> None:
+    """将当前峰值计入所有进行中的阶段（调用方持有_lock）；重置峰值前调用，外层阶段的峰值不会因内层阶段重置而丢失"""
+    peak = tracemalloc.get_traced_memory()[1]
+    for open_stage in _open_stages:
+        open_stage._peak = max(open_stage._peak, peak)
+
+
+class _Stage:
+    """记录单个阶段的墙钟时间、CPU时间、处理行数与峰值内存增量
+
+    阶段可以嵌套、也可以在多个线程中同时进行：tracemalloc按引用计数启停（外部已开启时不关闭），
+    每个阶段开始时先把当前峰值计入所有进行中的阶段再重置峰值，因此各阶段的峰值互不覆盖
+    （tracemalloc统计整个进程的分配，并发阶段的峰值包含其他线程同时发生的分配）
+    """
+
+    def __init__(self, name: str, rows: int = None):
+        self.name = name
+        self.rows = rows
+        self._peak = 0
+
+    def __enter__(self):
+        global _tracing_refs, _owns_tracing
+        with _lock:
+            if _tracing_refs == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _owns_tracing = True
+            _tracing_refs += 1
+            _sample_peak()
+            tracemalloc.reset_peak()
+            self._memory_start = tracemalloc.get_traced_memory()[0]
+            _open_stages.append(self)
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _tracing_refs, _owns_tracing
+        wall = time.perf_counter() - self._wall_start
+        cpu = time.process_time() - self._cpu_start
+        with _lock:
+            _sample_peak()
+            _open_stages.remove(self)
+            _tracing_refs -= 1
+            if _tracing_refs == 0 and _owns_tracing:
+                tracemalloc.stop()
+                _owns_tracing = False
+        record = {
+            "stage": self.name,
+            "timestamp": time.time(),
+            "wall_seconds": wall,
+            "cpu_seconds": cpu,
+            "rows": self.rows,
+            "peak_memory_delta_mb": max(self._peak - self._memory_start, 0) / 1024 / 1024,
+            "ok": exc_type is None,
+            "session": getattr(_thread_state, "session", None)
+        }
+        with _lock:
+            _records.append(record)
+        logger.info(json.dumps(record, ensure_ascii=False))
+        return False
+
+
+def stage(name: str, rows: int = None):
+    """阶段计时上下文：with stage("data.load_raw_data") as s: ...; s.rows = len(df)"""
+    if not is_enabled():
+        return _NOOP_STAGE
+    return _Stage(name, rows)
+
+
+# ---------------------- 3. 结果导出 ----------------------
+def records(session: str = None) -> list:
+    """返回最近的阶段记录（按时间顺序）；给定session时只返回该会话的记录"""
+    with _lock:
+        return [record for record in _records if session is None or record.get("session") == session]
+
+
+def clear(session: str = None) -> None:
+    """清空阶段记录；给定session时只清空该会话的记录"""
+    with _lock:
+        kept = [] if session is None else [record for record in _records if record.get("session") != session]
+        _records.clear()
+        _records.extend(kept)
+
+
+def records_json(session: str = None) -> str:
+    """阶段记录的JSON文本（session含义同records）"""
+    return json.dumps(records(session), ensure_ascii=False, indent=2)
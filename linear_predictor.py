@@ -0,0 +1,138 @@
+import hashlib
+import numpy as np
+
+from atomic_file import atomic_path
+
+# ---------------------- 1. 配置参数 ----------------------
+# 融合后的线性模型文件（仅含系数与截距，加载时无需scikit-learn）
+FUSED_MODEL_PATH = "score_prediction_model.npz"
+# 分专业模型包（各专业系数矩阵 + 全局兜底模型）
+SEGMENTED_MODEL_PATH = "score_prediction_segmented.npz"
+# 模型输入特征（顺序需与model.py训练时一致）
+FEATURE_COLS = ["study_hours", "attendance", "midterm_score", "homework_rate"]
+
+
+# ---------------------- 2. 融合 StandardScaler + LinearRegression ----------------------
+def fuse_linear_pipeline(scaler, model):
+    """将 标准化→线性回归 合并为原始特征上的一个仿射变换，返回（系数，截距）
+
+    y = ((x - mean) / scale) · w + b = x · (w / scale) + (b - mean · (w / scale))
+    """
+    coef = np.asarray(model.coef_, dtype=np.float64) / np.asarray(scaler.scale_, dtype=np.float64)
+    intercept = float(model.intercept_) - float(np.dot(np.asarray(scaler.mean_, dtype=np.float64), coef))
+    return coef, intercept
+
+
+def atomic_savez(path: str, **arrays) -> str:
+    """写入临时npz文件后原子替换，正在加载模型的进程只会看到完整的旧文件或新文件"""
+    with atomic_path(path) as tmp_path, open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    return path
+
+
+def save_fused_model(coef: np.ndarray, intercept: float, path: str = FUSED_MODEL_PATH) -> str:
+    """保存融合后的系数与截距（npz格式，原子替换）"""
+    return atomic_savez(path, coef=np.asarray(coef, dtype=np.float64), intercept=np.float64(intercept),
+                        feature_cols=np.array(FEATURE_COLS))
+
+
+# ---------------------- 3. 纯NumPy预测器 ----------------------
+class LinearPredictor:
+    """仅依赖NumPy的线性预测器：一次矩阵乘法完成 标准化+预测"""
+    __slots__ = ("coef", "intercept", "version")
+
+    def __init__(self, coef: np.ndarray, intercept: float):
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        # 模型版本：由系数与截距内容生成，用于下游按模型版本缓存结果
+        digest = hashlib.sha1(self.coef.tobytes() + np.float64(self.intercept).tobytes())
+        self.version = digest.hexdigest()[:12]
+
+    def predict(self, features) -> np.ndarray:
+        """features为 (n, 4) 的原始特征（未标准化），返回n个预测值"""
+        return np.asarray(features, dtype=np.float64) @ self.coef + self.intercept
+
+
+def load_fused_model(path: str = FUSED_MODEL_PATH) -> LinearPredictor:
+    """加载融合模型文件，文件不存在时抛出FileNotFoundError"""
+    with np.load(path) as artifact:
+        if list(artifact["feature_cols"]) != FEATURE_COLS:
+            raise ValueError(f"融合模型特征顺序不一致：{list(artifact['feature_cols'])}")
+        return LinearPredictor(artifact["coef"], artifact["intercept"])
+
+
+def check_fused_model(predictor: LinearPredictor, model, scaler, features: np.ndarray, atol: float = 1e-6) -> float:
+    """一致性校验：融合模型与sklearn 标准化+线性回归 的预测差异超过atol时抛出ValueError，返回最大绝对误差"""
+    # 统一按float64比较（sklearn对float32输入会以float32计算标准化）
+    features = np.asarray(features, dtype=np.float64)
+    expected = model.predict(scaler.transform(features))
+    max_error = float(np.max(np.abs(predictor.predict(features) - expected))) if len(features) else 0.0
+    if max_error > atol:
+        raise ValueError(f"融合模型与sklearn模型预测不一致，最大误差：{max_error:.3e}")
+    return max_error
+
+
+# ---------------------- 4. 分专业模型包（按专业路由） ----------------------
+def save_segmented_model(majors: list, coef: np.ndarray, intercept: np.ndarray, counts: np.ndarray,
+                         path: str = SEGMENTED_MODEL_PATH) -> str:
+    """保存分专业模型包：coef/intercept第0行为全局兜底模型，第i+1行对应majors[i]（majors按排序存储）"""
+    order = np.argsort(np.asarray(majors, dtype=str))
+    rows = np.concatenate([[0], order + 1])
+    return atomic_savez(path, majors=np.asarray(majors, dtype=str)[order], coef=np.asarray(coef, dtype=np.float64)[rows],
+                        intercept=np.asarray(intercept, dtype=np.float64)[rows],
+                        counts=np.asarray(counts, dtype=np.int64)[rows], feature_cols=np.array(FEATURE_COLS))
+
+
+class SegmentedPredictor:
+    """分专业线性预测器：所有专业的系数存为一个矩阵，按专业查行号后一次向量化计算整批预测（未知或样本不足的专业用全局模型）"""
+    __slots__ = ("majors", "coef", "intercept", "counts", "version")
+
+    def __init__(self, majors: np.ndarray, coef: np.ndarray, intercept: np.ndarray, counts: np.ndarray = None):
+        self.majors = np.asarray(majors, dtype=str)  # 已排序，用于二分查找
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.counts = None if counts is None else np.asarray(counts, dtype=np.int64)
+        digest = hashlib.sha1(self.coef.tobytes() + self.intercept.tobytes() + "|".join(self.majors).encode("utf-8"))
+        self.version = digest.hexdigest()[:12]
+
+    def _rows_for(self, values: np.ndarray) -> np.ndarray:
+        """专业名数组 → 系数矩阵行号（未知专业为0，即全局模型）"""
+        if len(self.majors) == 0:
+            return np.zeros(len(values), dtype=np.intp)
+        pos = np.minimum(np.searchsorted(self.majors, values), len(self.majors) - 1)
+        return np.where(self.majors[pos] == values, pos + 1, 0)
+
+    def route(self, majors) -> np.ndarray:
+        """每行学生对应的系数矩阵行号：category列只对类别查找一次再按编码取值，其余输入按去重后的取值查找"""
+        majors = getattr(majors, "cat", majors)
+        if hasattr(majors, "codes") and hasattr(majors, "categories"):
+            category_rows = self._rows_for(np.asarray(majors.categories, dtype=str))
+            codes = np.asarray(majors.codes)
+            return np.where(codes >= 0, category_rows[codes], 0)
+        values, inverse = np.unique(np.asarray(majors, dtype=str), return_inverse=True)
+        return self._rows_for(values)[inverse.reshape(-1)]
+
+    def predict(self, features, majors=None) -> np.ndarray:
+        """features为 (n, 4) 的原始特征，majors为对应的n个专业（为None时全部使用全局模型）"""
+        X = np.asarray(features, dtype=np.float64)
+        if majors is None:
+            return X @ self.coef[0] + self.intercept[0]
+        rows = self.route(majors)
+        if len(rows) and (rows == rows[0]).all():
+            # 整批同一专业：单个模型一次矩阵乘法
+            return X @ self.coef[rows[0]] + self.intercept[rows[0]]
+        # 混合专业：按行号取出各行对应的系数，所有专业在同一次向量化计算中完成
+        return np.einsum("ij,ij->i", X, self.coef[rows]) + self.intercept[rows]
+
+    def for_major(self, major: str) -> LinearPredictor:
+        """某专业实际使用的单个线性模型（未知专业返回全局模型）"""
+        row = int(self._rows_for(np.asarray([major], dtype=str))[0])
+        return LinearPredictor(self.coef[row], self.intercept[row])
+
+
+def load_segmented_model(path: str = SEGMENTED_MODEL_PATH) -> SegmentedPredictor:
+    """加载分专业模型包，文件不存在时抛出FileNotFoundError"""
+    with np.load(path) as artifact:
+        if list(artifact["feature_cols"]) != FEATURE_COLS:
+            raise ValueError(f"分专业模型特征顺序不一致：{list(artifact['feature_cols'])}")
+        return SegmentedPredictor(artifact["majors"], artifact["coef"], artifact["intercept"], artifact["counts"])
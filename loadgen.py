@@ -0,0 +1,86 @@
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+from tornado.httpclient import AsyncHTTPClient
+
+from serve import DEFAULT_PORT
+from synth import generate_columns
+
+# ---------------------- 1. 配置参数 ----------------------
+DEFAULT_REQUESTS = 5000
+DEFAULT_CONCURRENCY = 64
+
+
+def random_students(n: int, seed: int = 42) -> list:
+    """按真实数据的字段分布（synth.py）生成请求样本"""
+    columns = generate_columns(np.random.default_rng(seed), n)
+    fields = ["study_hours", "attendance", "midterm_score", "homework_rate"]
+    return [dict(zip(fields, map(float, values))) for values in zip(*(columns[field] for field in fields))]
+
+
+# ---------------------- 2. 并发压测 ----------------------
+async def run_load(url: str, n_requests: int, concurrency: int) -> dict:
+    """以固定并发数向 /predict 发送单条请求，统计客户端延迟与吞吐，并读取服务端指标"""
+    AsyncHTTPClient.configure(None, max_clients=concurrency)
+    client = AsyncHTTPClient()
+    bodies = [json.dumps(student) for student in random_students(n_requests)]
+    latencies = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < n_requests:
+            body = bodies[next_index]
+            next_index += 1
+            start = time.perf_counter()
+            try:
+                await client.fetch(f"{url}/predict", method="POST", body=body)
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+
+    try:
+        server_metrics = json.loads((await client.fetch(f"{url}/metrics")).body)
+    except Exception:
+        server_metrics = None
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "requests": n_requests,
+        "errors": errors,
+        "seconds": seconds,
+        "requests_per_sec": len(latencies) / seconds if seconds > 0 else 0.0,
+        "latency_p50_ms": float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else None,
+        "latency_p99_ms": float(np.percentile(latencies_ms, 99)) if len(latencies_ms) else None,
+        "server": server_metrics
+    }
+
+
+def format_ms(value) -> str:
+    """延迟（毫秒）的显示文本，没有成功请求时为“无”"""
+    return "无" if value is None else f"{value:.2f}ms"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="推理服务本地压测客户端")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_PORT}")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="总请求数")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="并发连接数")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load(args.url, args.requests, args.concurrency))
+    print(f"压测完成：{result['requests']}个请求，失败{result['errors']}个，耗时{result['seconds']:.2f}秒")
+    print(f"客户端吞吐：{result['requests_per_sec']:.0f}请求/秒，"
+          f"延迟p50={format_ms(result['latency_p50_ms'])}，p99={format_ms(result['latency_p99_ms'])}")
+    server = result["server"]
+    if server is None:
+        print("服务端：无法读取指标（/metrics请求失败）")
+    else:
+        print(f"服务端：平均批大小{server['mean_batch_size']:.1f}，"
+              f"延迟p50={format_ms(server['latency_p50_ms'])}，p99={format_ms(server['latency_p99_ms'])}")
@@ -1,3 +1,6 @@
+import os
+import time
+import argparse
 import pandas as pd
 import numpy as np
 import joblib  # 用于保存/加载pkl文件
@@ -9,67 +12,277 @@ import warnings
 warnings.filterwarnings('ignore')
 
 # 1. 导入你已有的数据处理模块（data.py），获取干净数据
+import data
+from atomic_file import atomic_path
 from data import process_student_data  # 调用data.py中的数据处理函数
+from linear_predictor import (FUSED_MODEL_PATH, SEGMENTED_MODEL_PATH, fuse_linear_pipeline, save_fused_model,
+                              load_fused_model, check_fused_model, save_segmented_model, load_segmented_model)
+from training_stats import STATS_PATH, empty_stats, accumulate_stats, solve_linear_model, save_stats, load_stats
+from model_selection import LEADERBOARD_PATH, run_model_selection
+from segmented_model import MIN_SEGMENT_ROWS, train_segments
+from feature_store import attach_feature_store
 
-# 2. 加载处理后的学生数据
-print("正在从data.py加载处理后的学生数据...")
-processed_data = process_student_data()  # 依赖你data.py中的process_student_data函数
-
-# 3. 准备模型输入特征与目标变量
 # 定义特征（影响期末成绩的因素）和目标（期末成绩）
 feature_cols = ["study_hours", "attendance", "midterm_score", "homework_rate"]  # 需与data.py输出的字段一致
 target_col = "final_score"
 
-# 验证字段是否存在（避免数据处理后字段缺失）
-missing_cols = [col for col in feature_cols + [target_col] if col not in processed_data.columns]
-if missing_cols:
-    raise ValueError(f"数据中缺失必要字段：{missing_cols}，请检查data.py的数据处理逻辑")
-
-X = processed_data[feature_cols].values  # 特征矩阵
-y = processed_data[target_col].values    # 目标变量（期末成绩）
-
-# 4. 特征标准化（消除量纲影响，提升模型精度）
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)  # 标准化后的特征
-
-# 5. 划分训练集与测试集（8:2，保证模型泛化能力）
-X_train, X_test, y_train, y_test = train_test_split(
-    X_scaled, y, test_size=0.2, random_state=42  # 固定random_state确保结果可复现
-)
-
-# 6. 训练线性回归模型
-print("正在训练期末成绩预测模型...")
-model = LinearRegression()
-model.fit(X_train, y_train)  # 用训练集训练模型
-
-# 7. 模型评估（验证模型效果，避免无效模型）
-y_test_pred = model.predict(X_test)
-test_r2 = r2_score(y_test, y_test_pred)  # 决定系数（越接近1越好）
-test_mse = mean_squared_error(y_test, y_test_pred)  # 均方误差（越小越好）
-
-print(f"\n模型评估结果：")
-print(f"测试集R²（决定系数）：{test_r2:.3f}")
-print(f"测试集MSE（均方误差）：{test_mse:.3f}")
-
-# 仅当模型效果合格时才保存（R²≥0.4，可根据需求调整阈值）
-if test_r2 < 0.4:
-    print("警告：模型预测效果较差（R²<0.4），建议优化数据或特征后再保存！")
-else:
-    # 8. 保存模型和标准化器为pkl文件
-    # 模型保存路径（与data.py、当前脚本同目录）
-    model_save_path = "score_prediction_model.pkl"
-    scaler_save_path = "scaler.pkl"
-
-    # 保存模型
-    joblib.dump(model, model_save_path)
+# 模型保存路径（与data.py、当前脚本同目录）
+model_save_path = "score_prediction_model.pkl"
+scaler_save_path = "scaler.pkl"
+
+# 模型合格阈值（R²≥0.4才保存，可根据需求调整阈值）
+R2_THRESHOLD = 0.4
+# 训练数据为模拟数据时的提示（模拟数据只评估，不覆盖已保存的模型）
+SYNTHETIC_DATA_WARNING = "警告：训练数据为模拟数据（未找到数据文件或缺少核心字段），不保存模型，已保存的模型保持不变！"
+
+
+# ---------------------- 保存模型文件（两种训练模式共用） ----------------------
+def atomic_joblib_dump(obj, path: str) -> str:
+    """joblib.dump到临时文件后原子替换目标文件"""
+    with atomic_path(path) as tmp_path:
+        joblib.dump(obj, tmp_path)
+    return path
+
+
+def save_model_artifacts(model, scaler, X_check: np.ndarray):
+    """保存模型、标准化器与融合模型，并校验融合模型与sklearn流水线预测一致"""
+    # 保存模型（先写临时文件再原子替换，正在读取的进程不会读到写了一半的文件）
+    atomic_joblib_dump(model, model_save_path)
     print(f"\n模型已保存为：{model_save_path}")
 
     # 保存特征标准化器（预测时需用同一标准化器处理输入特征）
-    joblib.dump(scaler, scaler_save_path)
+    atomic_joblib_dump(scaler, scaler_save_path)
     print(f"特征标准化器已保存为：{scaler_save_path}")
 
-    # 验证加载（确保保存成功）
+    # 导出融合模型（标准化+线性回归合并为一个仿射变换，web1.py加载时无需scikit-learn）
+    coef, intercept = fuse_linear_pipeline(scaler, model)
+    save_fused_model(coef, intercept, FUSED_MODEL_PATH)
+    print(f"融合模型已保存为：{FUSED_MODEL_PATH}")
+
+    # 验证加载（确保保存成功），并校验融合模型与sklearn流水线预测一致
     loaded_model = joblib.load(model_save_path)
     loaded_scaler = joblib.load(scaler_save_path)
-    print(f"\n验证：pkl文件加载成功！")
-    print(f"加载后的模型测试预测值：{loaded_model.predict(X_test[:1])[0]:.2f}（原始测试值：{y_test[0]:.2f}）")
+    max_error = check_fused_model(load_fused_model(FUSED_MODEL_PATH), loaded_model, loaded_scaler, X_check)
+    print(f"\n验证：pkl文件加载成功！融合模型一致性校验通过（最大误差：{max_error:.2e}）")
+    return loaded_model, loaded_scaler
+
+
+# ---------------------- 加载训练数据（两种全量模式共用） ----------------------
+def load_training_data(use_feature_store: bool = False) -> pd.DataFrame:
+    """默认调用data.py重新处理数据；use_feature_store时直接挂载已发布的共享特征库（内存映射，不重新解析CSV）"""
+    if use_feature_store:
+        store = attach_feature_store()
+        if store is not None:
+            print(f"正在挂载共享特征库（版本{store.version}）...")
+            return store.frame()
+        print("特征库尚未发布（python feature_store.py publish），改为从data.py加载")
+    print("正在从data.py加载处理后的学生数据...")
+    return process_student_data()  # 依赖你data.py中的process_student_data函数
+
+
+# ---------------------- 全量训练（默认模式） ----------------------
+def train_full_model(use_feature_store: bool = False, progress=None) -> dict:
+    """加载全部数据→标准化→8:2划分→训练线性回归→评估→合格时保存；返回评估指标
+
+    progress(stage, fraction, **info) 为可选的进度回调（后台训练任务用于回传进度与指标）
+    """
+    report = progress or (lambda stage, fraction, **info: None)
+    # 2. 加载处理后的学生数据
+    report("load", 0.0)
+    processed_data = load_training_data(use_feature_store)
+
+    # 3. 准备模型输入特征与目标变量
+    # 验证字段是否存在（避免数据处理后字段缺失）
+    missing_cols = [col for col in feature_cols + [target_col] if col not in processed_data.columns]
+    if missing_cols:
+        raise ValueError(f"数据中缺失必要字段：{missing_cols}，请检查data.py的数据处理逻辑")
+
+    X = processed_data[feature_cols].values  # 特征矩阵
+    y = processed_data[target_col].values    # 目标变量（期末成绩）
+    report("fit", 0.3, rows=len(X))
+
+    # 4. 特征标准化（消除量纲影响，提升模型精度）
+    start = time.perf_counter()
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)  # 标准化后的特征
+
+    # 5. 划分训练集与测试集（8:2，保证模型泛化能力）
+    X_train, X_test, y_train, y_test = train_test_split(
+        X_scaled, y, test_size=0.2, random_state=42  # 固定random_state确保结果可复现
+    )
+
+    # 6. 训练线性回归模型
+    print("正在训练期末成绩预测模型...")
+    model = LinearRegression()
+    model.fit(X_train, y_train)  # 用训练集训练模型
+    fit_seconds = time.perf_counter() - start
+
+    # 7. 模型评估（验证模型效果，避免无效模型）
+    y_test_pred = model.predict(X_test)
+    test_r2 = r2_score(y_test, y_test_pred)  # 决定系数（越接近1越好）
+    test_mse = mean_squared_error(y_test, y_test_pred)  # 均方误差（越小越好）
+    metrics = {"rows": len(X), "r2": float(test_r2), "mse": float(test_mse), "fit_seconds": fit_seconds, "saved": False,
+               "synthetic": data.is_synthetic(processed_data)}
+    report("evaluate", 0.7, **metrics)
+
+    print(f"\n模型评估结果：")
+    print(f"测试集R²（决定系数）：{test_r2:.3f}")
+    print(f"测试集MSE（均方误差）：{test_mse:.3f}")
+
+    # 仅当数据为真实数据且模型效果合格时才保存
+    if metrics["synthetic"]:
+        print(SYNTHETIC_DATA_WARNING)
+    elif test_r2 < R2_THRESHOLD:
+        print(f"警告：模型预测效果较差（R²<{R2_THRESHOLD}），建议优化数据或特征后再保存！")
+    else:
+        # 8. 保存模型和标准化器为pkl文件，并导出融合模型
+        report("save", 0.85, **metrics)
+        loaded_model, _ = save_model_artifacts(model, scaler, X)
+        print(f"加载后的模型测试预测值：{loaded_model.predict(X_test[:1])[0]:.2f}（原始测试值：{y_test[0]:.2f}）")
+        metrics.update(saved=True, model_version=load_fused_model(FUSED_MODEL_PATH).version)
+    return metrics
+
+
+# ---------------------- 增量训练（流式累加充分统计量） ----------------------
+def build_sklearn_pipeline(solution: dict):
+    """由统计量求解结果构造与全量训练同格式的StandardScaler与LinearRegression"""
+    scaler = StandardScaler()
+    scaler.mean_ = solution["mean"]
+    scaler.var_ = solution["var"]
+    scaler.scale_ = solution["scale"]
+    scaler.n_features_in_ = len(feature_cols)
+    scaler.n_samples_seen_ = solution["n"]
+
+    model = LinearRegression()
+    model.coef_ = solution["coef"]
+    model.intercept_ = solution["intercept"]
+    model.n_features_in_ = len(feature_cols)
+    return model, scaler
+
+
+def train_incremental_model(file_path: str = None, chunksize: int = None, rebuild: bool = False):
+    """逐块累加 [X, y] 的充分统计量并持久化；源文件只追加了新行时仅读取新增部分，再由统计量求解模型"""
+    file_path = data.FILE_PATH if file_path is None else file_path
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"增量训练需要真实数据文件：{file_path}")
+    if data.is_multi_source(file_path):
+        raise ValueError("增量训练按字节位置跟踪已读数据，只支持单个CSV文件；多文件数据源请使用full模式")
+    end = data.complete_lines_end(file_path)
+
+    # 读取已有统计量，并确认其对应的已读数据未被改写
+    stats, digest = None, None
+    if not rebuild and os.path.exists(STATS_PATH):
+        saved = load_stats(STATS_PATH)
+        if saved["source"] == os.path.abspath(file_path) and saved["offset"] <= end:
+            # 对已读区间的全部字节求指纹，中间任意一行被改写都会触发重新累加
+            digest = data.hash_byte_range(file_path, 0, saved["offset"])
+        if digest is not None and saved["fingerprint"] == digest.hexdigest():
+            stats = saved
+        else:
+            print("数据源已变化（文件不同或已有行被改写），重新累加统计量...")
+
+    resumed = stats is not None
+    if not resumed:
+        print("正在流式累加全部数据的统计量...")
+        stats = empty_stats(len(feature_cols))
+        with data.open_byte_range(file_path, 0, end) as reader:
+            for chunk in data.iter_processed_chunks(reader, chunksize=chunksize,
+                                                    required_fields=feature_cols + [target_col]):
+                stats = accumulate_stats(stats, chunk[feature_cols].to_numpy(), chunk[target_col].to_numpy())
+    else:
+        # 新增行的缺失值用已累加数据的全局均值填充
+        fill_values = dict(zip(feature_cols + [target_col], stats["mean"]))
+        rows_before = stats["n"]
+        start = max(stats["offset"], data.header_end(file_path))
+        for chunk in data.iter_appended_chunks(file_path, start, end, chunksize or 100000, fill_values):
+            stats = accumulate_stats(stats, chunk[feature_cols].to_numpy(), chunk[target_col].to_numpy())
+        print(f"已合并新增数据：{stats['n'] - rows_before}行（累计{stats['n']}行）")
+
+    # 增量合并时由已读区间的指纹续算新增字节，无需重新读取整个文件
+    fingerprint = (data.hash_byte_range(file_path, saved["offset"], end, digest).hexdigest() if resumed
+                   else data.prefix_fingerprint(file_path, end))
+    stats.update(source=os.path.abspath(file_path), offset=end, fingerprint=fingerprint)
+    save_stats(stats, STATS_PATH)
+    print(f"充分统计量已保存为：{STATS_PATH}")
+
+    # 由统计量求解标准化参数与回归系数（增量模式无独立测试集，以训练集R²作为保存门槛）
+    solution = solve_linear_model(stats)
+    print(f"\n模型评估结果：")
+    print(f"训练集R²（决定系数）：{solution['r2']:.3f}")
+    if solution["r2"] < R2_THRESHOLD:
+        print(f"警告：模型预测效果较差（R²<{R2_THRESHOLD}），建议优化数据或特征后再保存！")
+        return
+
+    model, scaler = build_sklearn_pipeline(solution)
+    # 一致性校验样本：按统计量的均值与标准差生成
+    X_check = solution["mean"] + solution["scale"] * np.random.default_rng(42).standard_normal((1000, len(feature_cols)))
+    save_model_artifacts(model, scaler, X_check)
+
+
+# ---------------------- 分专业训练（各专业一个模型，并行训练） ----------------------
+def train_segmented_model(min_rows: int = MIN_SEGMENT_ROWS, max_workers: int = None, use_feature_store: bool = False):
+    """全局模型+各专业模型在多进程中并行训练，样本不足的专业回退到全局模型；全部系数保存为一个模型包"""
+    processed_data = load_training_data(use_feature_store)
+    X = processed_data[feature_cols].to_numpy()
+    y = processed_data[target_col].to_numpy()
+
+    print(f"正在并行训练分专业模型（样本数<{min_rows}的专业使用全局模型）...")
+    bundle, report = train_segments(X, y, processed_data["major"], min_rows=min_rows, max_workers=max_workers)
+    print(f"\n各专业模型评估结果：\n{report.round(4).to_string(index=False)}")
+
+    global_r2 = report["test_r2"].iloc[0]
+    if data.is_synthetic(processed_data):
+        print(SYNTHETIC_DATA_WARNING)
+        return None
+    if global_r2 < R2_THRESHOLD:
+        print(f"警告：全局模型预测效果较差（R²<{R2_THRESHOLD}），建议优化数据或特征后再保存！")
+        return None
+
+    save_segmented_model(bundle["majors"], bundle["coef"], bundle["intercept"], bundle["counts"], SEGMENTED_MODEL_PATH)
+    predictor = load_segmented_model(SEGMENTED_MODEL_PATH)
+    print(f"\n分专业模型包已保存为：{SEGMENTED_MODEL_PATH}（{len(predictor.majors)}个专业模型 + 全局模型，版本{predictor.version}）")
+    return predictor
+
+
+# ---------------------- 模型选择（多候选模型并行交叉验证） ----------------------
+def select_model(n_splits: int = 5, max_workers: int = None, use_feature_store: bool = False):
+    """对候选模型做k折交叉验证，输出兼顾准确率与预测开销的排行榜"""
+    processed_data = load_training_data(use_feature_store)
+    X = processed_data[feature_cols].to_numpy()
+    y = processed_data[target_col].to_numpy()
+
+    print(f"正在并行评估候选模型（{n_splits}折交叉验证）...")
+    leaderboard = run_model_selection(X, y, n_splits=n_splits, max_workers=max_workers)
+    pd.set_option("display.width", 200)
+    print(f"\n模型排行榜：\n{leaderboard.round(4).to_string()}")
+    leaderboard.to_csv(LEADERBOARD_PATH, index_label="rank", encoding="utf-8")
+    print(f"\n排行榜已保存为：{LEADERBOARD_PATH}")
+    return leaderboard
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="训练期末成绩预测模型")
+    parser.add_argument("--mode", choices=["full", "incremental", "select", "segmented"], default="full",
+                        help="full：全量加载训练；incremental：流式累加充分统计量，只读取新增行；select：候选模型并行交叉验证；"
+                             "segmented：按专业分别训练并保存模型包")
+    parser.add_argument("--data", default=None, help="学生数据CSV路径（默认使用data.py中的FILE_PATH）")
+    parser.add_argument("--chunksize", type=int, default=None, help="增量模式每块行数（默认按内存上限估算）")
+    parser.add_argument("--rebuild", action="store_true", help="增量模式下忽略已保存的统计量，从头累加")
+    parser.add_argument("--folds", type=int, default=5, help="模型选择的交叉验证折数")
+    parser.add_argument("--workers", type=int, default=None, help="模型选择/分专业训练的并行进程数（默认为CPU核数）")
+    parser.add_argument("--min-segment-rows", type=int, default=MIN_SEGMENT_ROWS,
+                        help="分专业训练时单独建模所需的最少样本数，不足时使用全局模型")
+    parser.add_argument("--feature-store", action="store_true",
+                        help="full/select/segmented模式直接挂载已发布的共享特征库，而不是重新处理CSV")
+    args = parser.parse_args()
+
+    if args.data:
+        data.FILE_PATH = args.data
+    if args.mode == "incremental":
+        train_incremental_model(chunksize=args.chunksize, rebuild=args.rebuild)
+    elif args.mode == "segmented":
+        train_segmented_model(min_rows=args.min_segment_rows, max_workers=args.workers, use_feature_store=args.feature_store)
+    elif args.mode == "select":
+        select_model(n_splits=args.folds, max_workers=args.workers, use_feature_store=args.feature_store)
+    else:
+        train_full_model(use_feature_store=args.feature_store)
@@ -0,0 +1,89 @@
+import time
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.linear_model import Lasso, LinearRegression, Ridge
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import KFold
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import PolynomialFeatures, StandardScaler
+
+from shared_arrays import map_with_shared_arrays
+
+# ---------------------- 1. 配置参数 ----------------------
+# 排行榜输出路径
+LEADERBOARD_PATH = "model_selection_leaderboard.csv"
+# 单条预测延迟的测量次数（取中位数）
+LATENCY_REPEATS = 200
+
+
+# ---------------------- 2. 候选模型 ----------------------
+def candidate_estimators() -> dict:
+    """候选模型及超参数（均在标准化后的四个特征上训练）"""
+    candidates = {"linear": make_pipeline(StandardScaler(), LinearRegression())}
+    for alpha in [0.1, 1.0, 10.0, 100.0]:
+        candidates[f"ridge(alpha={alpha})"] = make_pipeline(StandardScaler(), Ridge(alpha=alpha))
+    for alpha in [0.001, 0.01, 0.1]:
+        candidates[f"lasso(alpha={alpha})"] = make_pipeline(StandardScaler(), Lasso(alpha=alpha))
+    for degree in [2, 3]:
+        candidates[f"poly{degree}+ridge(alpha=1.0)"] = make_pipeline(
+            StandardScaler(), PolynomialFeatures(degree=degree, include_bias=False), Ridge(alpha=1.0))
+    for n_estimators, depth in [(100, 3), (200, 3)]:
+        candidates[f"gbrt(n={n_estimators},depth={depth})"] = make_pipeline(
+            StandardScaler(), GradientBoostingRegressor(n_estimators=n_estimators, max_depth=depth, random_state=42))
+    return candidates
+
+
+# ---------------------- 3. 单个候选的交叉验证（在子进程中执行） ----------------------
+def evaluate_candidate(name: str, estimator, X_path: str, y_path: str, n_splits: int, seed: int) -> dict:
+    """以只读内存映射方式读取共享特征矩阵，做k折交叉验证并测量训练耗时与预测延迟"""
+    X = np.load(X_path, mmap_mode="r")
+    y = np.load(y_path, mmap_mode="r")
+
+    r2_list, mse_list, fit_seconds, batch_seconds = [], [], [], []
+    fitted = None
+    for train_idx, test_idx in KFold(n_splits=n_splits, shuffle=True, random_state=seed).split(X):
+        fitted = clone(estimator)
+        start = time.perf_counter()
+        fitted.fit(X[train_idx], y[train_idx])
+        fit_seconds.append(time.perf_counter() - start)
+
+        X_test = X[test_idx]
+        start = time.perf_counter()
+        y_pred = fitted.predict(X_test)
+        batch_seconds.append((time.perf_counter() - start) / len(test_idx))
+        r2_list.append(r2_score(y[test_idx], y_pred))
+        mse_list.append(mean_squared_error(y[test_idx], y_pred))
+
+    # 单条预测延迟（网页表单场景）
+    single_row = np.ascontiguousarray(X[:1])
+    single_seconds = []
+    for _ in range(LATENCY_REPEATS):
+        start = time.perf_counter()
+        fitted.predict(single_row)
+        single_seconds.append(time.perf_counter() - start)
+
+    return {
+        "candidate": name,
+        "r2_mean": float(np.mean(r2_list)),
+        "r2_std": float(np.std(r2_list)),
+        "mse_mean": float(np.mean(mse_list)),
+        "fit_seconds": float(np.mean(fit_seconds)),
+        "batch_predict_us_per_row": float(np.mean(batch_seconds) * 1e6),
+        "single_predict_us": float(np.median(single_seconds) * 1e6)
+    }
+
+
+# ---------------------- 4. 并行模型选择主函数 ----------------------
+def run_model_selection(X: np.ndarray, y: np.ndarray, n_splits: int = 5, max_workers: int = None,
+                        candidates: dict = None, seed: int = 42) -> pd.DataFrame:
+    """在进程池中并行评估全部候选模型；特征矩阵只落盘一次，各进程共享同一份内存映射"""
+    candidates = candidate_estimators() if candidates is None else candidates
+    tasks = [{"name": name, "estimator": estimator, "n_splits": n_splits, "seed": seed}
+             for name, estimator in candidates.items()]
+    results = map_with_shared_arrays(evaluate_candidate, tasks, X, y, max_workers, prefix="model_selection_")
+
+    leaderboard = pd.DataFrame(results).sort_values("r2_mean", ascending=False).reset_index(drop=True)
+    leaderboard.index = leaderboard.index + 1
+    return leaderboard
@@ -0,0 +1,76 @@
+import argparse
+import time
+import numpy as np
+
+from data import DEFAULT_MAX_MEMORY_MB, SOURCE_FILE_FIELD, iter_processed_chunks
+from linear_predictor import (FEATURE_COLS, FUSED_MODEL_PATH, SEGMENTED_MODEL_PATH, SegmentedPredictor,
+                              load_fused_model, load_segmented_model)
+
+# ---------------------- 1. 配置参数 ----------------------
+# 输出文件中保留的明细字段（存在时输出；目录/通配符输入附带来源文件）
+OUTPUT_COLS = ["student_id", "major", "gender", *FEATURE_COLS, "final_score", SOURCE_FILE_FIELD]
+
+
+# ---------------------- 2. 模型加载与向量化预测 ----------------------
+def load_model(model_path: str = FUSED_MODEL_PATH, segmented_path: str = None):
+    """加载model.py导出的融合模型（纯NumPy预测器）；给定segmented_path时加载分专业模型包"""
+    if segmented_path is not None:
+        return load_segmented_model(segmented_path)
+    return load_fused_model(model_path)
+
+
+def predict_scores(model, features: np.ndarray, majors=None) -> np.ndarray:
+    """对原始特征矩阵整体预测期末成绩，结果截断到0~100并保留1位小数（分专业模型按majors路由）"""
+    if majors is not None and isinstance(model, SegmentedPredictor):
+        return np.clip(model.predict(features, majors), 0, 100).round(1)
+    return np.clip(model.predict(features), 0, 100).round(1)
+
+
+def iter_batch_predictions(model, source, chunksize: int = None,
+                           max_memory_mb: float = DEFAULT_MAX_MEMORY_MB):
+    """复用data.py的字段映射与清洗流程，逐块产出带predicted_score列的结果
+
+    输入文件不存在时抛出FileNotFoundError，缺少任一特征字段时抛出ValueError（不补充或模拟任何数据）
+    """
+    for chunk in iter_processed_chunks(source, max_memory_mb=max_memory_mb, chunksize=chunksize,
+                                       required_fields=FEATURE_COLS):
+        result = chunk[[col for col in OUTPUT_COLS if col in chunk.columns]]
+        majors = chunk["major"] if "major" in chunk.columns else None
+        result = result.assign(predicted_score=predict_scores(model, chunk[FEATURE_COLS].to_numpy(), majors))
+        yield result
+
+
+# ---------------------- 3. 批量预测主函数（结果流式写入输出文件） ----------------------
+def predict_file(source, output, model, chunksize: int = None,
+                 max_memory_mb: float = DEFAULT_MAX_MEMORY_MB) -> dict:
+    """批量预测source中的全部学生，逐块追加写入output（路径或文件对象），返回行数、耗时与吞吐"""
+    start = time.perf_counter()
+    rows = 0
+    for i, result in enumerate(iter_batch_predictions(model, source, chunksize, max_memory_mb)):
+        if isinstance(output, str):
+            result.to_csv(output, mode="w" if i == 0 else "a", header=(i == 0), index=False, encoding="utf-8")
+        else:
+            result.to_csv(output, header=(i == 0), index=False)
+        rows += len(result)
+    seconds = time.perf_counter() - start
+    return {"rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds if seconds > 0 else float("inf")}
+
+
+# ---------------------- 4. 命令行入口 ----------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量预测学生期末成绩")
+    parser.add_argument("input", help="学生数据CSV（字段与data.py的FIELD_MAPPING一致），也可以是目录或通配符")
+    parser.add_argument("output", help="预测结果输出CSV")
+    parser.add_argument("--chunksize", type=int, default=None, help="每块行数（默认按内存上限估算）")
+    parser.add_argument("--max-memory-mb", type=float, default=DEFAULT_MAX_MEMORY_MB, help="流式处理内存上限（MB）")
+    parser.add_argument("--segmented", nargs="?", const=SEGMENTED_MODEL_PATH, default=None,
+                        help="使用分专业模型包（model.py --mode segmented导出），按每行的专业路由")
+    args = parser.parse_args()
+
+    model = load_model(segmented_path=args.segmented)
+    try:
+        stats = predict_file(args.input, args.output, model, args.chunksize, args.max_memory_mb)
+    except (FileNotFoundError, ValueError) as e:
+        raise SystemExit(f"批量预测失败：{e}")
+    print(f"批量预测完成：{stats['rows']}行，耗时{stats['seconds']:.2f}秒，{stats['rows_per_sec']:.0f}行/秒")
+    print(f"结果已保存为：{args.output}")
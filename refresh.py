@@ -0,0 +1,193 @@
+import os
+import time
+import argparse
+import threading
+import pandas as pd
+from pandas.api.types import union_categoricals
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+
+import data
+from aggregates import build_major_aggregates, update_major_aggregates, save_major_aggregates
+
+# ---------------------- 1. 配置参数 ----------------------
+# 文件变化后等待的静默时间（秒）：写入方通常连续写多次，合并为一次刷新
+DEFAULT_DEBOUNCE_SECONDS = 0.5
+# 解析新增尾部时每块行数
+APPEND_CHUNKSIZE = 100000
+
+
+# ---------------------- 2. 增量数据集（清洗结果 + 聚合表） ----------------------
+def append_rows(frame: pd.DataFrame, new_rows: pd.DataFrame) -> pd.DataFrame:
+    """将新增的清洗结果拼接到已有数据之后；分类字段合并类别，避免拼接后退化为object列"""
+    if len(new_rows) == 0:
+        return frame
+    new_rows = new_rows[list(frame.columns)].copy()
+    for col in frame.columns:
+        if isinstance(frame[col].dtype, pd.CategoricalDtype) and isinstance(new_rows[col].dtype, pd.CategoricalDtype):
+            merged = union_categoricals([frame[col].array, new_rows[col].array])
+            frame[col] = pd.Categorical.from_codes(merged.codes[:len(frame)], dtype=merged.dtype)
+            new_rows[col] = pd.Categorical.from_codes(merged.codes[len(frame):], dtype=merged.dtype)
+    return pd.concat([frame, new_rows], ignore_index=True)
+
+
+def compute_fill_values(frame: pd.DataFrame) -> dict:
+    """由已有数据计算新增行的缺失值填充值（数值取均值，专业/性别取众数）"""
+    fill_values = {field: float(frame[field].mean()) for field in data.NUMERIC_FIELDS if field in frame.columns}
+    for field in ["major", "gender"]:
+        if field in frame.columns and len(frame) > 0:
+            fill_values[field] = frame[field].mode()[0]
+    return fill_values
+
+
+class IncrementalDataset:
+    """跟踪源CSV已读取的字节位置：文件只追加新行时仅解析尾部并累加到清洗结果与聚合表，已有行被改写时整体重建"""
+
+    def __init__(self, file_path: str = None, chunksize: int = APPEND_CHUNKSIZE):
+        self.file_path = data.FILE_PATH if file_path is None else file_path
+        self.chunksize = chunksize
+        self.frame = None
+        self.aggregates = None
+        self.fill_values = {}
+        self.offset = 0
+        self.fingerprint = None
+        self.version = None
+        self._subscribers = []
+
+    def subscribe(self, callback) -> None:
+        """注册下游回调：callback(dataset, new_rows, rebuilt)，每次刷新有变化时调用"""
+        self._subscribers.append(callback)
+
+    def rebuild(self) -> pd.DataFrame:
+        """全量重建：解析[0, 最后一个完整行)区间，重新计算聚合表"""
+        end = data.complete_lines_end(self.file_path)
+        with data.open_byte_range(self.file_path, 0, end) as reader:
+            raw_df = data.load_raw_data(reader)
+        frame = data.convert_data_types(data.supplement_required_fields(
+            data.handle_missing_values(data.standardize_fields(raw_df))))
+
+        self.frame = frame
+        self.aggregates = build_major_aggregates(frame)
+        self.fill_values = compute_fill_values(frame)
+        self._advance(end)
+        self._notify(frame, rebuilt=True)
+        return frame
+
+    def refresh(self) -> int:
+        """检查源文件变化并合并新增行，返回新增行数（无变化时为0；发生全量重建时为-1）"""
+        if self.frame is None:
+            self.rebuild()
+            return -1
+        end = data.complete_lines_end(self.file_path)
+        # 文件变短或已读区间的指纹变化，说明已有行被改写，只能整体重建
+        digest = data.hash_byte_range(self.file_path, 0, self.offset) if end >= self.offset else None
+        if digest is None or digest.hexdigest() != self.fingerprint:
+            self.rebuild()
+            return -1
+        if end == self.offset:
+            return 0
+
+        chunks = list(data.iter_appended_chunks(self.file_path, self.offset, end, self.chunksize,
+                                                self.fill_values, row_offset=len(self.frame)))
+        new_rows = pd.concat(chunks, ignore_index=True) if chunks else self.frame.iloc[:0]
+        rows_before = len(self.frame)
+        self.frame = append_rows(self.frame, new_rows)
+        self.aggregates = update_major_aggregates(self.aggregates, new_rows)
+        # 数值填充值按行数加权更新，无需重新扫描已有数据
+        for field in data.NUMERIC_FIELDS:
+            if field in self.fill_values and len(new_rows) > 0:
+                self.fill_values[field] = (self.fill_values[field] * rows_before
+                                           + float(new_rows[field].sum())) / len(self.frame)
+        # 已读区间的指纹续算新增字节即为新的指纹
+        self._advance(end, data.hash_byte_range(self.file_path, self.offset, end, digest))
+        self._notify(new_rows, rebuilt=False)
+        return len(new_rows)
+
+    def _advance(self, end: int, digest=None) -> None:
+        """记录已读取位置与指纹（digest为[0, end)的哈希对象，未给定时重新计算）；文件恰好止于完整行时，同步写入按数据版本命名的列式缓存与聚合表"""
+        self.offset = end
+        self.fingerprint = (data.prefix_fingerprint(self.file_path, end) if digest is None
+                            else digest.hexdigest())
+        version = data.data_version(self.file_path)
+        self.version = version
+        # 补充过核心字段（含模拟数据）的结果不写入缓存，以免缓存中丢失模拟数据标记
+        if version is not None and os.path.getsize(self.file_path) == end and not data.is_synthetic(self.frame):
+            data.save_cached_frame(self.frame, self.file_path, version)
+            save_major_aggregates(self.aggregates, version, self.file_path)
+
+    def _notify(self, new_rows: pd.DataFrame, rebuilt: bool) -> None:
+        for callback in self._subscribers:
+            callback(self, new_rows, rebuilt)
+
+
+# ---------------------- 3. 监听文件变化 ----------------------
+class _SourceFileHandler(FileSystemEventHandler):
+    """只关注目标CSV的修改/创建/移入事件，收到事件后置位，由主循环去抖后刷新"""
+
+    def __init__(self, file_path: str, changed: threading.Event):
+        self.file_path = os.path.abspath(file_path)
+        self.changed = changed
+
+    def on_any_event(self, event) -> None:
+        paths = [getattr(event, "src_path", None), getattr(event, "dest_path", None)]
+        if self.file_path in (os.path.abspath(path) for path in paths if path):
+            self.changed.set()
+
+
+def watch(dataset: IncrementalDataset, debounce: float = DEFAULT_DEBOUNCE_SECONDS,
+          stop: threading.Event = None) -> None:
+    """监听源文件所在目录，文件变化且静默debounce秒后执行一次增量刷新，直到stop被置位"""
+    stop = threading.Event() if stop is None else stop
+    changed = threading.Event()
+    observer = Observer()
+    observer.schedule(_SourceFileHandler(dataset.file_path, changed),
+                      os.path.dirname(os.path.abspath(dataset.file_path)), recursive=False)
+    observer.start()
+    try:
+        while not stop.is_set():
+            if not changed.wait(timeout=0.5):
+                continue
+            # 去抖：持续写入期间不断推迟，直到静默debounce秒
+            while changed.is_set():
+                changed.clear()
+                time.sleep(debounce)
+            if os.path.exists(dataset.file_path):
+                dataset.refresh()
+    finally:
+        observer.stop()
+        observer.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="监听学生数据CSV，只解析新增行并增量刷新缓存与聚合表")
+    parser.add_argument("--data", default=None, help="学生数据CSV路径（默认使用data.py中的FILE_PATH）")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE_SECONDS, help="文件变化后的静默等待秒数")
+    parser.add_argument("--retrain", action="store_true", help="每次刷新后按增量模式更新模型（只累加新增行的统计量）")
+    parser.add_argument("--publish-feature-store", action="store_true", help="每次刷新后重新发布共享特征库")
+    args = parser.parse_args()
+
+    if args.data:
+        data.FILE_PATH = args.data
+    if not os.path.exists(data.FILE_PATH):
+        raise SystemExit(f"数据文件不存在：{data.FILE_PATH}")
+    if data.is_multi_source(data.FILE_PATH):
+        raise SystemExit("监听模式按字节位置跟踪追加行，只支持单个CSV文件")
+
+    def report(dataset, new_rows, rebuilt):
+        action = "全量重建" if rebuilt else f"新增{len(new_rows)}行"
+        print(f"[{time.strftime('%H:%M:%S')}] {action}，共{len(dataset.frame)}行，数据版本{dataset.version}")
+        if args.publish_feature_store:
+            from feature_store import publish_feature_store
+            publish_feature_store(dataset.frame)
+        if args.retrain:
+            from model import train_incremental_model
+            train_incremental_model(dataset.file_path)
+
+    dataset = IncrementalDataset()
+    dataset.subscribe(report)
+    dataset.rebuild()
+    print(f"正在监听 {os.path.abspath(dataset.file_path)}（Ctrl+C退出）")
+    try:
+        watch(dataset, debounce=args.debounce)
+    except KeyboardInterrupt:
+        pass
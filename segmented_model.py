@@ -0,0 +1,77 @@
+import time
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from linear_predictor import fuse_linear_pipeline
+from shared_arrays import map_with_shared_arrays
+
+# ---------------------- 1. 配置参数 ----------------------
+# 专业样本数低于该值时不单独建模，预测时使用全局模型
+MIN_SEGMENT_ROWS = 200
+# 全局兜底模型在结果中的名称
+GLOBAL_SEGMENT = "(全局)"
+
+
+# ---------------------- 2. 单个分段的训练（在子进程中执行） ----------------------
+def fit_segment(name: str, X_path: str, y_path: str, rows: np.ndarray, seed: int = 42) -> dict:
+    """以只读内存映射方式读取共享特征矩阵，在指定行上 8:2划分→标准化→线性回归，返回融合系数与测试集R²"""
+    X = np.load(X_path, mmap_mode="r")[rows]
+    y = np.load(y_path, mmap_mode="r")[rows]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=seed)
+
+    start = time.perf_counter()
+    scaler = StandardScaler().fit(X_train)
+    model = LinearRegression().fit(scaler.transform(X_train), y_train)
+    fit_seconds = time.perf_counter() - start
+
+    coef, intercept = fuse_linear_pipeline(scaler, model)
+    return {
+        "segment": name,
+        "rows": len(rows),
+        "coef": coef,
+        "intercept": intercept,
+        "test_r2": float(r2_score(y_test, X_test @ coef + intercept)) if len(y_test) > 1 else float("nan"),
+        "fit_seconds": fit_seconds
+    }
+
+
+# ---------------------- 3. 并行训练主函数 ----------------------
+def train_segments(X: np.ndarray, y: np.ndarray, majors, min_rows: int = MIN_SEGMENT_ROWS,
+                   max_workers: int = None, seed: int = 42) -> tuple:
+    """全局模型与各专业模型在进程池中并行训练（特征矩阵只落盘一次，各进程共享内存映射）
+
+    返回（模型包参数dict：majors/coef/intercept/counts，各分段结果表）；样本数不足min_rows的专业不单独建模。
+    max_workers=1时在当前进程内依次训练（如在后台训练任务的守护进程中，守护进程不能再创建子进程）
+    """
+    majors = pd.Series(majors).astype(str).to_numpy()
+    names, inverse = np.unique(majors, return_inverse=True)
+    segments = {GLOBAL_SEGMENT: np.arange(len(majors))}
+    for i, name in enumerate(names):
+        rows = np.flatnonzero(inverse == i)
+        if len(rows) >= min_rows:
+            segments[name] = rows
+
+    tasks = [{"name": name, "rows": rows, "seed": seed} for name, rows in segments.items()]
+    results = map_with_shared_arrays(fit_segment, tasks, X, y, max_workers, prefix="segmented_model_")
+
+    bundle = {
+        "majors": [result["segment"] for result in results[1:]],
+        "coef": np.vstack([result["coef"] for result in results]),
+        "intercept": np.array([result["intercept"] for result in results]),
+        "counts": np.array([result["rows"] for result in results])
+    }
+    report = pd.DataFrame([{key: result[key] for key in ["segment", "rows", "test_r2", "fit_seconds"]}
+                           for result in results])
+    # 样本不足、预测时回退到全局模型的专业
+    fallback = pd.DataFrame({"segment": [name for name in names if name not in segments],
+                             "rows": [int((inverse == i).sum()) for i, name in enumerate(names) if name not in segments]})
+    if len(fallback):
+        fallback["test_r2"] = np.nan
+        fallback["fit_seconds"] = np.nan
+        fallback["segment"] = fallback["segment"] + "（使用全局模型）"
+        report = pd.concat([report, fallback], ignore_index=True)
+    return bundle, report
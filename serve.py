@@ -0,0 +1,197 @@
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+import numpy as np
+import tornado.web
+
+from linear_predictor import FEATURE_COLS, FUSED_MODEL_PATH, load_fused_model
+from predict import predict_scores
+
+# ---------------------- 1. 配置参数 ----------------------
+DEFAULT_PORT = 8600
+# 微批策略：凑满max_batch条或等待max_wait_ms毫秒后统一预测
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 2.0
+# 延迟统计窗口（最近的请求数）
+LATENCY_WINDOW = 10000
+
+
+# ---------------------- 2. 运行指标 ----------------------
+class ServiceMetrics:
+    """请求数、预测行数、批次大小与最近请求的延迟分布"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.batched_rows = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def observe(self, seconds: float, rows: int = 1):
+        self.requests += 1
+        self.rows += rows
+        self.latencies.append(seconds)
+
+    def snapshot(self) -> dict:
+        uptime = time.perf_counter() - self.started
+        latencies_ms = np.array(self.latencies) * 1000
+        return {
+            "uptime_seconds": uptime,
+            "requests": self.requests,
+            "rows": self.rows,
+            "rows_per_sec": self.rows / uptime if uptime > 0 else 0.0,
+            "batches": self.batches,
+            "mean_batch_size": self.batched_rows / self.batches if self.batches else 0.0,
+            "latency_p50_ms": float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else None,
+            "latency_p99_ms": float(np.percentile(latencies_ms, 99)) if len(latencies_ms) else None
+        }
+
+
+# ---------------------- 3. 微批合并 ----------------------
+class MicroBatcher:
+    """将并发的单条预测请求合并为一个批次，一次向量化预测后分别返回"""
+
+    def __init__(self, predictor, metrics: ServiceMetrics, max_batch: int = DEFAULT_MAX_BATCH,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        self.predictor = predictor
+        self.metrics = metrics
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+
+    async def submit(self, features: list) -> float:
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((features, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                # 队列中已有的请求直接取出，不再等待
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                scores = predict_scores(self.predictor, np.array([features for features, _ in batch], dtype=np.float64))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.metrics.batches += 1
+            self.metrics.batched_rows += len(batch)
+            for (_, future), score in zip(batch, scores):
+                if not future.done():
+                    future.set_result(float(score))
+
+
+# ---------------------- 4. HTTP接口 ----------------------
+def parse_student(student: dict) -> list:
+    """从JSON对象中按FEATURE_COLS顺序取出特征"""
+    missing = [col for col in FEATURE_COLS if col not in student]
+    if missing:
+        raise ValueError(f"缺少字段：{missing}")
+    return [float(student[col]) for col in FEATURE_COLS]
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    def initialize(self, service: dict):
+        self.service = service
+
+    def write_json(self, payload: dict, status: int = 200):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json; charset=utf-8")
+        self.finish(json.dumps(payload, ensure_ascii=False))
+
+
+class PredictHandler(BaseHandler):
+    """POST /predict：单个学生 {"study_hours":..,"attendance":..,"midterm_score":..,"homework_rate":..}"""
+
+    async def post(self):
+        start = time.perf_counter()
+        try:
+            features = parse_student(json.loads(self.request.body))
+        except (ValueError, TypeError) as e:
+            return self.write_json({"error": str(e)}, 400)
+        score = await self.service["batcher"].submit(features)
+        self.service["metrics"].observe(time.perf_counter() - start)
+        self.write_json({"predicted_score": score, "model_version": self.service["predictor"].version})
+
+
+class BatchPredictHandler(BaseHandler):
+    """POST /predict/batch：{"students": [{...}, ...]} 或 {"rows": [[4个特征], ...]}，整批直接向量化预测"""
+
+    async def post(self):
+        start = time.perf_counter()
+        try:
+            payload = json.loads(self.request.body)
+            if "rows" in payload:
+                X = np.asarray(payload["rows"], dtype=np.float64)
+                if X.size == 0:
+                    X = X.reshape(0, len(FEATURE_COLS))
+                # 不做reshape：列数不符的行若被重新分组，会把多个学生的特征拼成一个学生
+                if X.ndim != 2 or X.shape[1] != len(FEATURE_COLS):
+                    raise ValueError(f"rows需为二维数组，每行{len(FEATURE_COLS)}个特征（顺序：{FEATURE_COLS}）")
+            else:
+                X = np.array([parse_student(student) for student in payload["students"]], dtype=np.float64)
+        except (ValueError, TypeError, KeyError) as e:
+            return self.write_json({"error": str(e)}, 400)
+        scores = predict_scores(self.service["predictor"], X).tolist() if len(X) else []
+        self.service["metrics"].observe(time.perf_counter() - start, len(scores))
+        self.write_json({"predicted_scores": scores, "model_version": self.service["predictor"].version})
+
+
+class MetricsHandler(BaseHandler):
+    """GET /metrics：延迟分位数与吞吐"""
+
+    def get(self):
+        self.write_json({**self.service["metrics"].snapshot(), "model_version": self.service["predictor"].version})
+
+
+def make_app(predictor, max_batch: int = DEFAULT_MAX_BATCH, max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+    """创建应用；需在事件循环中启动 service["batcher"].run()"""
+    metrics = ServiceMetrics()
+    service = {
+        "predictor": predictor,
+        "metrics": metrics,
+        "batcher": MicroBatcher(predictor, metrics, max_batch, max_wait_ms)
+    }
+    app = tornado.web.Application([
+        (r"/predict", PredictHandler, {"service": service}),
+        (r"/predict/batch", BatchPredictHandler, {"service": service}),
+        (r"/metrics", MetricsHandler, {"service": service})
+    ])
+    return app, service
+
+
+async def serve(model_path: str, port: int, max_batch: int, max_wait_ms: float):
+    predictor = load_fused_model(model_path)
+    app, service = make_app(predictor, max_batch, max_wait_ms)
+    app.listen(port)
+    print(f"推理服务已启动：http://127.0.0.1:{port}（模型版本{predictor.version}，"
+          f"微批上限{max_batch}条/{max_wait_ms}ms）")
+    await service["batcher"].run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="期末成绩预测推理服务（微批合并）")
+    parser.add_argument("--model", default=FUSED_MODEL_PATH, help="model.py导出的融合模型文件")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="单个微批的最大请求数")
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS, help="凑批的最长等待时间（毫秒）")
+    args = parser.parse_args()
+    asyncio.run(serve(args.model, args.port, args.max_batch, args.max_wait_ms))
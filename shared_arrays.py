@@ -0,0 +1,25 @@
+import os
+import tempfile
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+
+# ---------------------- 进程池并行（特征矩阵落盘一次，各进程共享内存映射） ----------------------
+def map_with_shared_arrays(func, tasks: list, X: np.ndarray, y: np.ndarray, max_workers: int = None,
+                           prefix: str = "shared_arrays_") -> list:
+    """将X、y各落盘一次（.npy），对每个任务调用 func(**task, X_path=..., y_path=...)，按任务顺序返回结果
+
+    子进程以只读内存映射方式读取同一份文件，不随任务复制特征矩阵；
+    max_workers=1时在当前进程内依次执行（如在后台训练任务的守护进程中，守护进程不能再创建子进程）
+    """
+    with tempfile.TemporaryDirectory(prefix=prefix) as tmp_dir:
+        X_path = os.path.join(tmp_dir, "X.npy")
+        y_path = os.path.join(tmp_dir, "y.npy")
+        np.save(X_path, np.ascontiguousarray(X, dtype=np.float64))
+        np.save(y_path, np.ascontiguousarray(y, dtype=np.float64))
+
+        if max_workers == 1:
+            return [func(**task, X_path=X_path, y_path=y_path) for task in tasks]
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(func, **task, X_path=X_path, y_path=y_path) for task in tasks]
+            return [future.result() for future in futures]
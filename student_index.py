@@ -0,0 +1,93 @@
+import os
+import glob
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+import data
+from atomic_file import atomic_path
+
+# ---------------------- 1. 配置参数 ----------------------
+# 前缀搜索默认返回条数
+DEFAULT_PREFIX_LIMIT = 10
+
+
+def index_paths(file_path: str, version: str) -> tuple:
+    """某数据源、某数据版本的学号索引文件（排序后的学号、对应行号），与列式缓存放在同一目录"""
+    base = os.path.join(data.CACHE_DIR, f"student_index-{data.source_key(file_path)}-{version}")
+    return f"{base}-ids.npy", f"{base}-rows.npy"
+
+
+# ---------------------- 2. 学号索引 ----------------------
+class StudentIndex:
+    """学号 → 行号的有序索引：二分查找定位单个学生，前缀区间检索候选学号；记录从内存映射的列式缓存中按行读取"""
+
+    def __init__(self, ids: np.ndarray, rows: np.ndarray, table: pa.Table):
+        self.ids = ids  # 排序后的学号（UTF-8字节串）
+        self.rows = rows  # 对应的列式缓存行号
+        self.table = table
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def position(self, student_id: str):
+        """学号对应的行号，不存在时返回None"""
+        key = str(student_id).strip().encode("utf-8")
+        i = int(np.searchsorted(self.ids, key))
+        if i < len(self.ids) and self.ids[i] == key:
+            return int(self.rows[i])
+        return None
+
+    def lookup(self, student_id: str):
+        """按学号读取单个学生的完整记录（dict），不存在时返回None"""
+        row = self.position(student_id)
+        if row is None:
+            return None
+        return {name: column[row].as_py() for name, column in zip(self.table.column_names, self.table.columns)}
+
+    def prefix_search(self, prefix: str, limit: int = DEFAULT_PREFIX_LIMIT) -> list:
+        """返回以prefix开头的前limit个学号"""
+        key = str(prefix).strip().encode("utf-8")
+        start = int(np.searchsorted(self.ids, key, side="left"))
+        end = int(np.searchsorted(self.ids, key + b"\xff", side="left"))
+        return [value.decode("utf-8") for value in self.ids[start:min(end, start + limit)]]
+
+
+def build_index_arrays(table: pa.Table) -> tuple:
+    """对学号列排序，得到（排序后的学号字节串数组，对应行号数组）"""
+    student_ids = table.column("student_id").combine_chunks().cast(pa.string())
+    order = pc.sort_indices(student_ids)
+    ids = pc.take(student_ids, order).cast(pa.binary()).to_numpy(zero_copy_only=False).astype("S")
+    return ids, order.to_numpy().astype(np.int64)
+
+
+def load_student_index() -> StudentIndex:
+    """加载当前数据版本的学号索引（内存映射），不存在时由列式缓存构建并持久化
+
+    无真实数据文件，或数据不写入缓存（如缺少核心字段而补充了模拟数据）时在内存中构建
+    """
+    file_path = data.FILE_PATH
+    version = data.data_version(file_path)
+    df = None
+    # 确保列式缓存存在
+    if version is not None and not os.path.exists(data.cache_path(file_path, version)):
+        df = data.process_student_data()
+    if version is None or not os.path.exists(data.cache_path(file_path, version)):
+        df = data.process_student_data() if df is None else df
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        return StudentIndex(*build_index_arrays(table), table)
+
+    # 以内存映射方式打开列式缓存
+    table = feather.read_table(data.cache_path(file_path, version), memory_map=True)
+
+    ids_path, rows_path = index_paths(file_path, version)
+    if not (os.path.exists(ids_path) and os.path.exists(rows_path)):
+        ids, rows = build_index_arrays(table)
+        for path, array in [(ids_path, ids), (rows_path, rows)]:
+            with atomic_path(path, suffix=".npy") as tmp_path:
+                np.save(tmp_path, array)
+        # 删除同一数据源的旧版本索引
+        data.remove_stale_files(os.path.join(glob.escape(data.CACHE_DIR), f"student_index-{data.source_key(file_path)}-*.npy"),
+                                keep=[ids_path, rows_path])
+    return StudentIndex(np.load(ids_path, mmap_mode="r"), np.load(rows_path, mmap_mode="r"), table)
@@ -0,0 +1,179 @@
+import os
+import time
+import argparse
+from typing import Iterator
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+# ---------------------- 1. 配置参数（按student_data_adjusted_rounded.csv拟合） ----------------------
+# 生成规则版本：分布参数或字段变化时递增，按版本命名的合成数据缓存随之失效
+GENERATOR_VERSION = 1
+# 专业与性别（均匀抽取，与真实数据各专业/性别人数基本相等一致）
+MAJORS = ["人工智能", "大数据管理", "工商管理", "电子商务", "财务管理"]
+GENDERS = ["男", "女"]
+# 学号起始值
+FIRST_STUDENT_ID = 2023000001
+# 各专业出勤率相对总体的偏移（真实数据中各专业均值与总体均值之差）
+ATTENDANCE_OFFSETS = {"人工智能": 0.0006, "大数据管理": -0.0016, "工商管理": 0.0003, "电子商务": -0.0008, "财务管理": 0.0015}
+# 特征分布：正态（均值, 标准差）或均匀（下限, 上限），生成后截断到[下限, 上限]
+STUDY_HOURS = (20.0, 8.0, 5.0, 40.0)      # 正态，约3%截断在5小时
+MIDTERM_SCORE = (75.0, 15.0, 0.0, 100.0)  # 正态，约5%截断在100分
+ATTENDANCE = (0.6, 1.0)                   # 均匀（比例，非百分数）
+HOMEWORK_RATE = (0.7, 1.0)                # 均匀（比例，非百分数）
+# 期末成绩 = 截距 + 各特征线性组合 + 正态噪声（真实数据的最小二乘拟合，R²约0.55），截断到0~100分
+FINAL_SCORE_INTERCEPT = -0.21
+FINAL_SCORE_WEIGHTS = {"study_hours": 0.477, "attendance": 14.83, "midterm_score": 0.513, "homework_rate": 14.90}
+FINAL_SCORE_NOISE = 7.73
+# 每块行数（每块约占100MB以内的临时内存）
+DEFAULT_CHUNK_ROWS = 1_000_000
+# 原始CSV字段名（与data.py的FIELD_MAPPING一致）
+RAW_COLUMNS = {
+    "student_id": "学号",
+    "gender": "性别",
+    "major": "专业",
+    "study_hours": "每周学习时长（小时）",
+    "attendance": "上课出勤率",
+    "midterm_score": "期中考试分数",
+    "homework_rate": "作业完成率",
+    "final_score": "期末考试分数"
+}
+# 合成数据在DataFrame.attrs中的标记键：由（部分）合成数据拟合的模型不会被保存
+SYNTHETIC_ATTR = "synthetic"
+# 支持的输出格式（按扩展名识别）
+OUTPUT_FORMATS = {".csv": "csv", ".feather": "feather", ".arrow": "feather", ".parquet": "parquet"}
+
+
+def parse_rows(text: str) -> int:
+    """将 10k / 1m / 10m 形式的行数解析为整数（命令行与基准测试共用）"""
+    text = text.strip().lower()
+    units = {"k": 1_000, "m": 1_000_000}
+    if text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+# ---------------------- 2. 向量化生成 ----------------------
+def generate_columns(rng: np.random.Generator, n: int, missing_rate: float = 0.0) -> dict:
+    """生成n名学生的各字段数组（分类字段为编码）；missing_rate>0时4个特征各自按该比例置为缺失（NaN）"""
+    major_codes = rng.integers(0, len(MAJORS), n, dtype=np.int8)
+    gender_codes = rng.integers(0, len(GENDERS), n, dtype=np.int8)
+
+    study_hours = np.clip(rng.normal(STUDY_HOURS[0], STUDY_HOURS[1], n), STUDY_HOURS[2], STUDY_HOURS[3])
+    midterm_score = np.clip(rng.normal(MIDTERM_SCORE[0], MIDTERM_SCORE[1], n), MIDTERM_SCORE[2], MIDTERM_SCORE[3])
+    offsets = np.array([ATTENDANCE_OFFSETS.get(major, 0.0) for major in MAJORS])[major_codes]
+    attendance = np.clip(rng.uniform(*ATTENDANCE, n) + offsets, *ATTENDANCE)
+    homework_rate = rng.uniform(*HOMEWORK_RATE, n)
+
+    features = {"study_hours": study_hours, "attendance": attendance,
+                "midterm_score": midterm_score, "homework_rate": homework_rate}
+    final_score = FINAL_SCORE_INTERCEPT + rng.normal(0, FINAL_SCORE_NOISE, n)
+    for field, weight in FINAL_SCORE_WEIGHTS.items():
+        final_score += weight * features[field]
+    np.clip(final_score, 0, 100, out=final_score)
+
+    columns = {"major": major_codes, "gender": gender_codes}
+    for field, values in {**features, "final_score": final_score}.items():
+        columns[field] = values.round(2)  # 与真实数据一致保留2位小数
+    if missing_rate > 0:
+        for field in features:
+            columns[field][rng.random(n) < missing_rate] = np.nan
+    return columns
+
+
+def iter_synthetic_batches(rows: int, seed: int = 42, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                           missing_rate: float = 0.0) -> Iterator[pa.RecordBatch]:
+    """逐块产出字段与真实CSV一致的Arrow记录批（相同seed与chunk_rows产出完全相同的数据）"""
+    rng = np.random.default_rng(seed)
+    majors = pa.array(MAJORS)
+    genders = pa.array(GENDERS)
+    for start in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - start)
+        columns = generate_columns(rng, n, missing_rate)
+        arrays = {
+            "student_id": pa.array(np.arange(FIRST_STUDENT_ID + start, FIRST_STUDENT_ID + start + n, dtype=np.int64)),
+            "gender": pa.DictionaryArray.from_arrays(columns["gender"], genders),
+            "major": pa.DictionaryArray.from_arrays(columns["major"], majors)
+        }
+        for field in ["study_hours", "attendance", "midterm_score", "homework_rate", "final_score"]:
+            values = columns[field]
+            missing = np.isnan(values)
+            # 缺失值写为Arrow空值（CSV中为空字段，与真实导出一致）
+            arrays[field] = pa.array(values, mask=missing if missing.any() else None)
+        yield pa.RecordBatch.from_arrays(list(arrays.values()), names=[RAW_COLUMNS[field] for field in arrays])
+
+
+def synthetic_frame(rows: int, seed: int = 42, missing_rate: float = 0.0) -> pd.DataFrame:
+    """在内存中生成原始字段名的合成数据（结构同data.read_student_csv的结果）"""
+    batches = list(iter_synthetic_batches(rows, seed, missing_rate=missing_rate))
+    raw_df = pa.Table.from_batches(batches).to_pandas()
+    # 与读取CSV一致：分类字段为普通字符串列，交给data.py的清洗流程转换类型
+    for field in ["gender", "major"]:
+        raw_df[RAW_COLUMNS[field]] = raw_df[RAW_COLUMNS[field]].astype(str)
+    raw_df.attrs[SYNTHETIC_ATTR] = True
+    return raw_df
+
+
+def synthetic_student_data(rows: int, seed: int = 42) -> pd.DataFrame:
+    """生成合成数据并经过data.py的完整清洗流程，结果与process_student_data()的字段和类型一致"""
+    import data  # data.py的模拟数据也调用本模块，这里延迟导入
+    raw_df = synthetic_frame(rows, seed)
+    return data.convert_data_types(data.supplement_required_fields(
+        data.handle_missing_values(data.standardize_fields(raw_df))))
+
+
+# ---------------------- 3. 流式写入文件 ----------------------
+def output_format(path: str) -> str:
+    """按扩展名识别输出格式（.csv / .feather / .arrow / .parquet）"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in OUTPUT_FORMATS:
+        raise ValueError(f"不支持的输出格式：{ext or path}（支持{', '.join(OUTPUT_FORMATS)}）")
+    return OUTPUT_FORMATS[ext]
+
+
+def write_synthetic(path: str, rows: int, seed: int = 42, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                    missing_rate: float = 0.0, fmt: str = None) -> dict:
+    """逐块生成并直接写入CSV或列式文件（内存占用与总行数无关），返回行数、耗时与吞吐"""
+    fmt = output_format(path) if fmt is None else fmt
+    start = time.perf_counter()
+    batches = iter_synthetic_batches(rows, seed, chunk_rows, missing_rate)
+    first = next(batches, None)
+    if first is None:
+        raise ValueError("rows必须大于0")
+    schema = first.schema
+
+    if fmt == "csv":
+        options = pa_csv.WriteOptions(quoting_style="none", quoting_header="none")
+        writer = pa_csv.CSVWriter(path, schema, write_options=options)
+    elif fmt == "feather":
+        # 分类字段的字典在各块间相同，Feather v2（Arrow IPC文件）可直接逐块追加
+        writer = pa.ipc.new_file(path, schema, options=pa.ipc.IpcWriteOptions(compression="lz4"))
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(path, schema)
+    else:
+        raise ValueError(f"不支持的输出格式：{fmt}")
+    with writer:
+        writer.write_batch(first)
+        for batch in batches:
+            writer.write_batch(batch)
+
+    seconds = time.perf_counter() - start
+    return {"path": path, "rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds if seconds > 0 else float("inf")}
+
+
+# ---------------------- 4. 命令行入口 ----------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成与真实学生数据字段、分布一致的合成数据（用于压测与基准测试）")
+    parser.add_argument("output", help="输出文件（.csv / .feather / .arrow / .parquet）")
+    parser.add_argument("--rows", default="1m", help="行数，支持10k / 1m / 10m形式（默认1m）")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子（相同种子与块大小生成相同数据）")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="每块行数")
+    parser.add_argument("--missing-rate", type=float, default=0.0, help="特征字段的缺失比例（覆盖缺失值处理）")
+    args = parser.parse_args()
+
+    stats = write_synthetic(args.output, parse_rows(args.rows), args.seed, args.chunk_rows, args.missing_rate)
+    size_mb = os.path.getsize(args.output) / 1024 / 1024
+    print(f"已生成{stats['rows']}行：{args.output}（{size_mb:.1f}MB），"
+          f"耗时{stats['seconds']:.2f}秒，{stats['rows_per_sec']:.0f}行/秒")
@@ -0,0 +1,124 @@
+import os
+import time
+import queue
+import itertools
+import threading
+import multiprocessing
+
+# ---------------------- 1. 配置参数 ----------------------
+# 训练阶段 → 页面显示名称
+STAGE_LABELS = {
+    "start": "启动训练进程",
+    "load": "加载数据",
+    "fit": "训练模型",
+    "evaluate": "评估模型",
+    "save": "保存并切换模型",
+    "segmented": "训练并切换分专业模型",
+    "done": "已完成",
+    "failed": "失败"
+}
+
+
+# ---------------------- 2. 训练子进程 ----------------------
+def _run_training(events, use_feature_store: bool) -> None:
+    """子进程入口：调用model.py全量训练，并通过队列回传各阶段进度与评估指标
+
+    已有分专业模型包（页面按专业预测时实际使用）时，全局模型保存后同时重新训练并原子替换模型包
+    """
+    def progress(stage, fraction, **info):
+        events.put({"stage": stage, "fraction": fraction, "time": time.time(), **info})
+
+    try:
+        import model  # scikit-learn只在训练子进程中导入
+        from linear_predictor import SEGMENTED_MODEL_PATH
+        metrics = model.train_full_model(use_feature_store=use_feature_store, progress=progress)
+        if metrics["saved"] and os.path.exists(SEGMENTED_MODEL_PATH):
+            progress("segmented", 0.9, **metrics)
+            # 守护进程不能创建进程池，各专业模型在本进程内依次训练
+            predictor = model.train_segmented_model(max_workers=1, use_feature_store=use_feature_store)
+            metrics.update(segmented_saved=predictor is not None,
+                           segmented_version=None if predictor is None else predictor.version)
+        progress("done", 1.0, **metrics)
+    except Exception as e:
+        progress("failed", 1.0, error=f"{type(e).__name__}: {e}")
+
+
+# ---------------------- 3. 后台训练任务 ----------------------
+class TrainingJob:
+    """一次后台训练：在独立进程中运行，页面通过poll()非阻塞地读取进度"""
+
+    def __init__(self, job_id: int, use_feature_store: bool = False):
+        # spawn启动：不复制Streamlit进程的线程与锁状态
+        context = multiprocessing.get_context("spawn")
+        self.job_id = job_id
+        self.events = context.Queue()
+        self.process = context.Process(target=_run_training, args=(self.events, use_feature_store), daemon=True)
+        self.status = "running"  # running / succeeded（已保存）/ rejected（未达R²门槛）/ failed
+        self.stage = "start"
+        self.fraction = 0.0
+        self.metrics = {}
+        self.error = None
+        self.started = time.time()
+        self.finished = None
+
+    def start(self) -> "TrainingJob":
+        self.process.start()
+        return self
+
+    @property
+    def done(self) -> bool:
+        return self.status != "running"
+
+    def poll(self) -> "TrainingJob":
+        """取出队列中已到达的全部进度事件（不阻塞）并更新任务状态"""
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            self.stage = event.pop("stage")
+            self.fraction = event.pop("fraction")
+            event.pop("time", None)
+            if self.stage == "failed":
+                self.error = event.get("error")
+                self._finish("failed")
+            else:
+                self.metrics.update(event)
+                if self.stage == "done":
+                    self._finish("succeeded" if self.metrics.get("saved") else "rejected")
+        if not self.done and not self.process.is_alive():
+            # 子进程未回传结束事件就退出（如被杀死）
+            self.error = f"训练进程异常退出（退出码{self.process.exitcode}）"
+            self.stage = "failed"
+            self._finish("failed")
+        return self
+
+    def _finish(self, status: str) -> None:
+        self.status = status
+        self.finished = time.time()
+        self.process.join(timeout=1)
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.time()) - self.started
+
+
+class TrainingJobManager:
+    """进程内共享的训练任务管理器：同一时间最多运行一个训练任务，重复点击时返回正在运行的任务"""
+
+    def __init__(self):
+        self.job = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def start(self, use_feature_store: bool = False) -> TrainingJob:
+        with self._lock:
+            if self.job is not None and not self.job.poll().done:
+                return self.job
+            self.job = TrainingJob(next(self._ids), use_feature_store).start()
+            return self.job
+
+    def current(self):
+        """最近一次任务（已刷新状态），从未启动时返回None"""
+        with self._lock:
+            return None if self.job is None else self.job.poll()
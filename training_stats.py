@@ -0,0 +1,90 @@
+import numpy as np
+
+from linear_predictor import atomic_savez
+
+# ---------------------- 1. 配置参数 ----------------------
+# 充分统计量文件（增量训练时持久化，新增数据只需在其上累加）
+STATS_PATH = "training_stats.npz"
+
+
+# ---------------------- 2. 充分统计量的累加与合并 ----------------------
+def empty_stats(n_features: int) -> dict:
+    """初始化充分统计量：样本数、[X, y]的均值向量与离差积矩阵（中心化的 ZᵀZ，Z=[X, y]）"""
+    return {
+        "n": 0,
+        "mean": np.zeros(n_features + 1),
+        "comoment": np.zeros((n_features + 1, n_features + 1)),
+        "source": "",
+        "offset": 0,
+        "fingerprint": ""
+    }
+
+
+def merge_stats(stats: dict, other_n: int, other_mean: np.ndarray, other_comoment: np.ndarray) -> dict:
+    """按并行方差公式合并两组统计量（数值稳定，等价于直接累加 XᵀX、Xᵀy）"""
+    n = stats["n"] + other_n
+    if other_n == 0:
+        return stats
+    delta = other_mean - stats["mean"]
+    stats["comoment"] = stats["comoment"] + other_comoment + np.outer(delta, delta) * (stats["n"] * other_n / n)
+    stats["mean"] = stats["mean"] + delta * (other_n / n)
+    stats["n"] = n
+    return stats
+
+
+def accumulate_stats(stats: dict, X: np.ndarray, y: np.ndarray) -> dict:
+    """将一块数据的统计量累加进stats"""
+    Z = np.column_stack([np.asarray(X, dtype=np.float64), np.asarray(y, dtype=np.float64)])
+    if len(Z) == 0:
+        return stats
+    chunk_mean = Z.mean(axis=0)
+    centered = Z - chunk_mean
+    return merge_stats(stats, len(Z), chunk_mean, centered.T @ centered)
+
+
+# ---------------------- 3. 由统计量求解标准化参数与回归系数 ----------------------
+def solve_linear_model(stats: dict) -> dict:
+    """求解最小二乘：返回标准化器参数（均值/方差，与StandardScaler一致）、标准化空间的系数与截距、训练集R²"""
+    n = stats["n"]
+    if n < 2:
+        raise ValueError("样本数不足，无法求解模型")
+    cov = stats["comoment"] / n
+    cov_xx, cov_xy, var_y = cov[:-1, :-1], cov[:-1, -1], cov[-1, -1]
+    mean_x, mean_y = stats["mean"][:-1], stats["mean"][-1]
+
+    # 原始特征空间的系数：cov_xx · β = cov_xy
+    beta = np.linalg.lstsq(cov_xx, cov_xy, rcond=None)[0]
+    var_x = np.diag(cov_xx).copy()
+    scale = np.sqrt(var_x)
+    scale[scale == 0] = 1.0  # 与StandardScaler一致：常数列不缩放
+
+    return {
+        "mean": mean_x,
+        "var": var_x,
+        "scale": scale,
+        "coef": beta * scale,  # 标准化空间的系数
+        "intercept": float(mean_y),  # 标准化后特征均值为0，截距即y的均值
+        "r2": float(beta @ cov_xy / var_y) if var_y > 0 else 0.0,
+        "n": n
+    }
+
+
+# ---------------------- 4. 统计量持久化 ----------------------
+def save_stats(stats: dict, path: str = STATS_PATH) -> str:
+    """保存充分统计量及其对应的数据源位置（文件、已读字节偏移、已读区域指纹）"""
+    return atomic_savez(path, n=np.int64(stats["n"]), mean=stats["mean"], comoment=stats["comoment"],
+                        source=np.array(stats["source"]), offset=np.int64(stats["offset"]),
+                        fingerprint=np.array(stats["fingerprint"]))
+
+
+def load_stats(path: str = STATS_PATH) -> dict:
+    """读取充分统计量，文件不存在时抛出FileNotFoundError"""
+    with np.load(path) as saved:
+        return {
+            "n": int(saved["n"]),
+            "mean": saved["mean"],
+            "comoment": saved["comoment"],
+            "source": str(saved["source"]),
+            "offset": int(saved["offset"]),
+            "fingerprint": str(saved["fingerprint"])
+        }
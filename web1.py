@@ -1,53 +1,257 @@
+import io
+import os
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-import joblib
+import instrument
+from instrument import stage
+
+# 各页面所需的数据处理、模型与绘图库均在页面函数内导入：
+# 只打开项目介绍页时不加载pandas/pyarrow/plotly，共享资源每个进程只创建一次（st.cache_resource/st.cache_data）
 
 # ---------------------- 模拟数据处理模块（替代原有data.py） ----------------------
 def process_student_data():
-    """模拟学生数据生成（用于测试，实际使用时替换为真实数据加载逻辑）"""
-    majors = ["大数据管理", "计算机科学", "人工智能", "软件工程", "信息管理"]
-    genders = ["男", "女"]
-    
-    # 生成模拟数据
-    np.random.seed(42)
-    data = []
-    for major in majors:
-        # 大数据管理专业出勤率稍低，模拟颜色淡的场景
-        att_base = 0.76 if major == "大数据管理" else np.random.uniform(0.78, 0.85)
-        for gender in genders:
-            n_students = np.random.randint(30, 50)
-            for _ in range(n_students):
-                data.append({
-                    "major": major,
-                    "gender": gender,
-                    "midterm_score": np.random.uniform(40, 95),
-                    "final_score": np.random.uniform(45, 98),
-                    "study_hours": np.random.uniform(5, 25),
-                    "attendance": np.random.uniform(att_base - 0.02, att_base + 0.02),
-                    "homework_rate": np.random.uniform(0.7, 1.0)
-                })
-    return pd.DataFrame(data)
+    """模拟学生数据（用于测试，实际使用时发布共享特征库）：与data.py找不到数据文件时的模拟数据相同，字段与分布均与真实数据一致"""
+    from synth import synthetic_student_data
+    from data import MOCK_ROWS, MOCK_SEED
+    return synthetic_student_data(MOCK_ROWS, seed=MOCK_SEED)
 
 # ---------------------- 全局配置 ----------------------
 st.set_page_config(page_title="学生成绩分析与预测系统", layout="wide")
-# 加载数据
-processed_data = process_student_data()
-# 加载模型（确保pkl文件存在）
-try:
-    model = joblib.load("score_prediction_model.pkl")
-    scaler = joblib.load("scaler.pkl")
-except FileNotFoundError:
-    model = None
-
-# ---------------------- 侧边栏导航 ----------------------
-st.sidebar.title("导航菜单")
-page = st.sidebar.radio("", ["项目介绍", "专业数据分析", "成绩预测"])
+# 隐藏的诊断视图：URL带 ?diag=1 时开启阶段计时，并在侧边栏展示结果
+show_diagnostics = st.query_params.get("diag") == "1"
+# 只对当前会话的脚本线程开关计时（每次运行都设置，线程被复用时不会沿用其他会话的设置）；
+# 阶段记录在进程内共享，按会话标记区分，诊断视图只展示、清空本会话的记录
+diag_session = st.session_state.setdefault("diag_session", os.urandom(8).hex())
+instrument.enable_for_thread(show_diagnostics, session=diag_session)
+# 模拟数据固定随机种子生成，版本号固定
+MOCK_DATA_VERSION = "mock-seed42"
+# 假设分析引擎缓存上限（全局模型与各专业模型各一个）
+WHATIF_ENGINE_ENTRIES = 16
+
+
+# ---------------------- 共享资源（按版本缓存，每个进程只创建一次） ----------------------
+@st.cache_resource(show_spinner=False)
+def load_student_data(version: str):
+    """按数据版本加载一次学生数据：已发布共享特征库时挂载（内存映射，多个worker进程共享物理内存），否则生成模拟数据"""
+    with stage("web1.process_student_data") as s:
+        if version == MOCK_DATA_VERSION:
+            df = process_student_data()
+        else:
+            from feature_store import attach_feature_store
+            df = attach_feature_store(version=version).frame()
+        s.rows = len(df)
+    return df
+
+
+def get_student_data():
+    """当前数据及其版本（特征库以发布版本为数据版本）；返回的DataFrame在会话间共享，只读使用"""
+    from feature_store import current_version
+    version = current_version() or MOCK_DATA_VERSION
+    return load_student_data(version), version
+
+
+@st.cache_data(show_spinner=False)
+def get_major_aggregates(data_version: str, _df):
+    """每个数据版本只加载一次专业聚合表（人数/求和/及格人数）：监听刷新（refresh.py）已按版本增量维护时直接读取，否则由明细数据计算"""
+    from aggregates import build_major_aggregates, load_major_aggregates
+    store = load_major_aggregates(data_version) if data_version != MOCK_DATA_VERSION else None
+    return build_major_aggregates(_df) if store is None else store
+
+
+@st.cache_data(show_spinner=False)
+def get_distribution_summaries(data_version: str, major: str, _df) -> dict:
+    """按专业与数据版本缓存分布图摘要（直方图分箱、箱线图分位数），图表只传输摘要而非原始行"""
+    from aggregates import histogram_summary, box_summary
+    df_major = _df[_df["major"] == major]
+    return {
+        "final_score": histogram_summary(df_major["final_score"].to_numpy(), nbins=20),
+        "study_hours": box_summary(df_major["study_hours"].to_numpy())
+    }
+
+
+@st.cache_resource(show_spinner=False)
+def get_analysis_figures(data_version: str, target_major: str, _major_store, _dist_summaries) -> dict:
+    """按数据版本缓存专业分析页的图表对象（构建plotly图表比序列化耗时得多），重跑时只需序列化"""
+    import numpy as np
+    import plotly.express as px
+    import plotly.graph_objects as go
+    from aggregates import gender_ratio as get_gender_ratio, major_means, attendance_means
+
+    # 1. 各专业男女性别比例
+    gender_ratio = get_gender_ratio(_major_store)
+    fig_gender = px.bar(
+        gender_ratio.melt(id_vars="major", value_vars=["男", "女"], var_name="性别", value_name="比例"),
+        x="major", y="比例", color="性别", barmode="group",
+        color_discrete_map={"男": "#1f77b4", "女": "#aec7e8"},
+        labels={"比例": "比例", "major": "专业"},
+        height=300
+    )
+    fig_gender.update_layout(
+        xaxis_title="专业",  # 补充x轴标题
+        legend_title="性别",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+
+    # 2. 各专业学习指标对比（多折线图，双轴）
+    score_data = major_means(_major_store)
+    fig_score = go.Figure()
+    fig_score.add_trace(go.Scatter(
+        x=score_data["major"],
+        y=score_data["midterm_score"],
+        name="期中考试分数",
+        mode="lines+markers",
+        line=dict(color="#1f77b4")
+    ))
+    fig_score.add_trace(go.Scatter(
+        x=score_data["major"],
+        y=score_data["final_score"],
+        name="期末考试分数",
+        mode="lines+markers",
+        line=dict(color="#ff7f0e")
+    ))
+    fig_score.add_trace(go.Scatter(
+        x=score_data["major"],
+        y=score_data["study_hours"],
+        name="每周学习时长",
+        mode="lines+markers",
+        line=dict(color="#2ca02c"),
+        yaxis="y2"
+    ))
+    fig_score.update_layout(
+        xaxis_title="专业",  # 补充major对应的标题
+        yaxis=dict(title="分数"),
+        yaxis2=dict(title="每周学习时长（小时）", overlaying="y", side="right"),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        height=300
+    )
+
+    # 3. 各专业出勤率分析（优化颜色）
+    att_data = attendance_means(_major_store)
+    # 优化1：固定颜色范围 + 更鲜明的绿色渐变
+    fig_att = px.bar(
+        att_data, x="major", y="attendance", color="attendance",
+        color_continuous_scale=["#d9f0a3", "#78c679", "#238443"],  # 更鲜明的绿色渐变
+        range_color=[att_data["attendance"].min() - 0.01, att_data["attendance"].max() + 0.01],  # 自适应颜色范围
+        color_continuous_midpoint=att_data["attendance"].mean(),  # 以平均值为中点
+        labels={"attendance": "平均上课出勤率", "major": "专业"},
+        height=300
+    )
+    # 优化2：调整颜色条显示，增强可读性
+    fig_att.update_layout(
+        xaxis_title="专业",  # 补充x轴标题
+        coloraxis_showscale=True,
+        coloraxis_colorbar=dict(
+            title="平均出勤率",
+            tickformat=".1%",  # 百分比显示
+            len=0.8  # 缩短颜色条，更美观
+        ),
+        legend=None
+    )
+    # 优化3：给柱子添加数值标签
+    fig_att.add_trace(go.Bar(
+        x=att_data["major"],
+        y=att_data["attendance"],
+        text=[f"{x:.1%}" for x in att_data["attendance"]],
+        textposition="auto",
+        showlegend=False,
+        marker=dict(color="rgba(0,0,0,0)")  # 透明柱子，只显示文字
+    ))
+
+    # 4. 目标专业成绩分布（直方图）+ 学习时长分布（箱线图），均由服务端摘要绘制
+    score_hist = _dist_summaries["final_score"]
+    fig_score_dist = go.Figure(go.Bar(
+        x=(score_hist["edges"][:-1] + score_hist["edges"][1:]) / 2,
+        y=score_hist["counts"],
+        width=np.diff(score_hist["edges"]),
+        marker=dict(color="#1f77b4"),
+        hovertemplate="期末成绩：%{x:.1f}<br>人数：%{y}<extra></extra>"
+    ))
+    fig_score_dist.update_layout(xaxis_title="期末成绩", yaxis_title="人数", bargap=0, height=300)
+    study_box = _dist_summaries["study_hours"]
+    fig_study_box = go.Figure(go.Box(
+        q1=[study_box["q1"]], median=[study_box["median"]], q3=[study_box["q3"]],
+        lowerfence=[study_box["lowerfence"]], upperfence=[study_box["upperfence"]], mean=[study_box["mean"]],
+        name="", marker=dict(color="#1f77b4"), boxpoints=False
+    ))
+    fig_study_box.update_layout(yaxis_title="学习时长（小时）", height=300)
+
+    return {"gender": fig_gender, "score": fig_score, "attendance": fig_att,
+            "score_dist": fig_score_dist, "study_box": fig_study_box}
+
+
+def artifact_version(path: str):
+    """模型文件的版本标识（修改时间+大小），文件不存在时为None；模型文件被原子替换后标识随之变化"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def get_fused_model(artifact: str):
+    """每个模型文件版本只加载一次（model.py导出的npz，纯NumPy预测，无需导入scikit-learn）；切换新版本后旧版本被释放"""
+    from linear_predictor import FUSED_MODEL_PATH, load_fused_model
+    with stage("web1.load_model"):
+        return load_fused_model(FUSED_MODEL_PATH)
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def get_segmented_model(artifact: str):
+    """每个分专业模型包版本只加载一次；切换新版本后旧版本被释放"""
+    from linear_predictor import SEGMENTED_MODEL_PATH, load_segmented_model
+    with stage("web1.load_segmented_model"):
+        return load_segmented_model(SEGMENTED_MODEL_PATH)
+
+
+def get_models():
+    """按文件版本取（全局模型，分专业模型包）：后台训练保存新模型后，下一次页面运行自动切换到新版本"""
+    from linear_predictor import FUSED_MODEL_PATH, SEGMENTED_MODEL_PATH
+    fused_artifact = artifact_version(FUSED_MODEL_PATH)
+    segmented_artifact = artifact_version(SEGMENTED_MODEL_PATH)
+    # 分专业模型包（model.py --mode segmented导出）存在时按专业路由，否则全部使用全局模型
+    return (get_fused_model(fused_artifact) if fused_artifact else None,
+            get_segmented_model(segmented_artifact) if segmented_artifact else None)
+
+
+@st.cache_resource(show_spinner=False)
+def get_training_jobs():
+    """进程内共享的后台训练任务管理器（所有会话看到同一个任务）"""
+    from training_jobs import TrainingJobManager
+    return TrainingJobManager()
+
+
+@st.cache_resource(show_spinner=False, max_entries=WHATIF_ENGINE_ENTRIES)
+def get_whatif_engine(model_version: str, _model):
+    """每个模型版本只创建一个假设分析引擎（其内部按输入组合缓存预测曲线）；只保留最近使用的若干个，旧模型版本的引擎随之释放"""
+    from whatif import WhatIfEngine
+    return WhatIfEngine(_model)
+
+
+@st.cache_resource(show_spinner=False)
+def get_image(path: str, max_width: int) -> bytes:
+    """每张图片只缩放/编码一次：宽度不超过显示宽度时st.image直接使用原始字节，不再在每次运行时重新缩放编码"""
+    from PIL import Image
+    with Image.open(path) as image:
+        if image.width <= max_width:
+            with open(path, "rb") as f:
+                return f.read()
+        image_format = image.format
+        resized = image.resize((max_width, int(image.height * max_width / image.width)), Image.BILINEAR)
+    buffer = io.BytesIO()
+    resized.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+@st.cache_resource(show_spinner=False)
+def get_student_index(data_version: str):
+    """每个数据版本只加载一次学号索引（内存映射，进程内共享）"""
+    from student_index import load_student_index
+    return load_student_index()
+
 
 # ---------------------- 1. 项目介绍界面 ----------------------
-if page == "项目介绍":
+def render_intro():
+    """项目介绍页：纯静态内容，不加载数据、模型与图表库"""
     st.title("学生成绩分析与预测系统")
     st.divider()
 
@@ -68,7 +272,7 @@ if page == "项目介绍":
         st.subheader("专业数据分析")
         st.write("1.各专业男女性别比例")
         # 仅修改此处：替换为你的截图路径
-        st.image("jietu.png", use_container_width=True)
+        st.image(get_image("jietu.png", 800), use_container_width=True)
         st.caption("学生数据分析示意图")
 
     st.divider()
@@ -112,8 +316,19 @@ if page == "项目介绍":
     with col_tech4:
         st.write("机器学习：Scikit-learn")
 
+
 # ---------------------- 2. 专业数据分析界面（最终优化版） ----------------------
-elif page == "专业数据分析":
+def render_major_analysis():
+    """专业数据分析页：只需要聚合表、分布摘要与按版本缓存的图表"""
+    from aggregates import gender_ratio as get_gender_ratio, major_means, attendance_means, major_summary, list_majors
+
+    processed_data, data_version = get_student_data()
+    major_store = get_major_aggregates(data_version, processed_data)
+    target_major = "大数据管理" if "大数据管理" in list_majors(major_store) else list_majors(major_store)[0]
+    # 成绩分布+学习时长分布：服务端分箱/计算分位数，只向浏览器传输摘要
+    dist_summaries = get_distribution_summaries(data_version, target_major, processed_data)
+    figures = get_analysis_figures(data_version, target_major, major_store, dist_summaries)
+
     st.title("专业数据分析")
     st.divider()
 
@@ -121,22 +336,9 @@ elif page == "专业数据分析":
     st.subheader("1. 各专业男女性别比例")
     col_gender_chart, col_gender_table = st.columns([2, 1])
     with col_gender_chart:
-        gender_ratio = processed_data.groupby(["major", "gender"]).size().unstack(fill_value=0)
-        gender_ratio = gender_ratio.div(gender_ratio.sum(axis=1), axis=0).reset_index()
-        fig_gender = px.bar(
-            gender_ratio.melt(id_vars="major", value_vars=["男", "女"], var_name="性别", value_name="比例"),
-            x="major", y="比例", color="性别", barmode="group",
-            color_discrete_map={"男": "#1f77b4", "女": "#aec7e8"},
-            labels={"比例": "比例", "major": "专业"},
-            height=300
-        )
-        fig_gender.update_layout(
-            xaxis_title="专业",  # 补充x轴标题
-            legend_title="性别", 
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-        )
-        st.plotly_chart(fig_gender, use_container_width=True)
+        st.plotly_chart(figures["gender"], use_container_width=True)
     with col_gender_table:
+        gender_ratio = get_gender_ratio(major_store)
         gender_table = gender_ratio[["major", "男", "女"]].rename(columns={"男": "男性比例", "女": "女性比例"}).round(4)
         st.dataframe(gender_table.set_index("major"), use_container_width=True)
 
@@ -146,45 +348,9 @@ elif page == "专业数据分析":
     st.subheader("2. 各专业学习指标对比")
     col_score_chart, col_score_table = st.columns([2, 1])
     with col_score_chart:
-        score_data = processed_data.groupby("major").agg({
-            "midterm_score": "mean",
-            "final_score": "mean",
-            "study_hours": "mean"
-        }).reset_index()
-        # 多折线图（双轴）
-        fig_score = go.Figure()
-        fig_score.add_trace(go.Scatter(
-            x=score_data["major"], 
-            y=score_data["midterm_score"], 
-            name="期中考试分数", 
-            mode="lines+markers", 
-            line=dict(color="#1f77b4")
-        ))
-        fig_score.add_trace(go.Scatter(
-            x=score_data["major"], 
-            y=score_data["final_score"], 
-            name="期末考试分数", 
-            mode="lines+markers", 
-            line=dict(color="#ff7f0e")
-        ))
-        fig_score.add_trace(go.Scatter(
-            x=score_data["major"], 
-            y=score_data["study_hours"], 
-            name="每周学习时长", 
-            mode="lines+markers", 
-            line=dict(color="#2ca02c"), 
-            yaxis="y2"
-        ))
-        fig_score.update_layout(
-            xaxis_title="专业",  # 补充major对应的标题
-            yaxis=dict(title="分数"),
-            yaxis2=dict(title="每周学习时长（小时）", overlaying="y", side="right"),
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-            height=300
-        )
-        st.plotly_chart(fig_score, use_container_width=True)
+        st.plotly_chart(figures["score"], use_container_width=True)
     with col_score_table:
-        score_table = score_data.rename(columns={
+        score_table = major_means(major_store).rename(columns={
             "midterm_score": "期中考试分数",
             "final_score": "期末考试分数",
             "study_hours": "每周学习时长（小时）"
@@ -197,92 +363,80 @@ elif page == "专业数据分析":
     st.subheader("3. 各专业出勤率分析")
     col_att_chart, col_att_table = st.columns([2, 1])
     with col_att_chart:
-        att_data = processed_data.groupby("major")["attendance"].mean().reset_index()
-        
-        # 优化1：固定颜色范围 + 更鲜明的绿色渐变
-        fig_att = px.bar(
-            att_data, x="major", y="attendance", color="attendance",
-            color_continuous_scale=["#d9f0a3", "#78c679", "#238443"],  # 更鲜明的绿色渐变
-            range_color=[att_data["attendance"].min() - 0.01, att_data["attendance"].max() + 0.01],  # 自适应颜色范围
-            color_continuous_midpoint=att_data["attendance"].mean(),  # 以平均值为中点
-            labels={"attendance": "平均上课出勤率", "major": "专业"},
-            height=300
-        )
-        # 优化2：调整颜色条显示，增强可读性
-        fig_att.update_layout(
-            xaxis_title="专业",  # 补充x轴标题
-            coloraxis_showscale=True, 
-            coloraxis_colorbar=dict(
-                title="平均出勤率",
-                tickformat=".1%",  # 百分比显示
-                len=0.8  # 缩短颜色条，更美观
-            ),
-            legend=None
-        )
-        # 优化3：给柱子添加数值标签
-        fig_att.add_trace(go.Bar(
-            x=att_data["major"], 
-            y=att_data["attendance"],
-            text=[f"{x:.1%}" for x in att_data["attendance"]],
-            textposition="auto",
-            showlegend=False,
-            marker=dict(color="rgba(0,0,0,0)")  # 透明柱子，只显示文字
-        ))
-        st.plotly_chart(fig_att, use_container_width=True)
+        st.plotly_chart(figures["attendance"], use_container_width=True)
     with col_att_table:
-        att_table = att_data.rename(columns={"attendance": "平均出勤率", "major": "专业"}).round(4)
+        att_table = attendance_means(major_store).rename(columns={"attendance": "平均出勤率", "major": "专业"}).round(4)
         st.dataframe(att_table.set_index("专业"), use_container_width=True)
 
     st.divider()
 
     # 4. 大数据管理专业专项分析（全中文展示期末成绩）
     st.subheader("4. 大数据管理专业专项分析")
-    target_major = "大数据管理" if "大数据管理" in processed_data["major"].unique() else processed_data["major"].unique()[0]
-    df_target = processed_data[processed_data["major"] == target_major]
+    target_summary = major_summary(major_store, target_major)
     
-    # 核心指标卡片
+    # 核心指标卡片（直接读取聚合表）
     col_metric1, col_metric2, col_metric3, col_metric4 = st.columns(4)
     with col_metric1:
-        st.metric("平均出勤率", f"{df_target['attendance'].mean():.1%}")
+        st.metric("平均出勤率", f"{target_summary['attendance']:.1%}")
     with col_metric2:
-        st.metric("平均期末成绩", f"{df_target['final_score'].mean():.1f}分")  # 改为“期末成绩”
+        st.metric("平均期末成绩", f"{target_summary['final_score']:.1f}分")  # 改为“期末成绩”
     with col_metric3:
-        st.metric("通过率", f"{(df_target['final_score'] >= 60).mean():.1%}")
+        st.metric("通过率", f"{target_summary['pass_rate']:.1%}")
     with col_metric4:
-        st.metric("平均学习时长", f"{df_target['study_hours'].mean():.1f}小时")
+        st.metric("平均学习时长", f"{target_summary['study_hours']:.1f}小时")
 
-    # 成绩分布+学习时长分布（全中文标题/标签）
     col_dist1, col_dist2 = st.columns(2)
     with col_dist1:
         st.subheader(f"{target_major}专业期末成绩分布")  # 改为“期末成绩”
-        fig_score_dist = px.histogram(
-            df_target, 
-            x="final_score", 
-            nbins=20, 
-            color_discrete_sequence=["#1f77b4"], 
-            height=300,
-            labels={"final_score": "期末成绩"}  # x轴标签改为中文
-        )
-        fig_score_dist.update_layout(xaxis_title="期末成绩", yaxis_title="人数")
-        st.plotly_chart(fig_score_dist, use_container_width=True)
+        st.plotly_chart(figures["score_dist"], use_container_width=True)
     with col_dist2:
         st.subheader(f"{target_major}专业学习时长分布")
-        fig_study_box = px.box(
-            df_target, 
-            y="study_hours", 
-            color_discrete_sequence=["#1f77b4"], 
-            height=300,
-            labels={"study_hours": "学习时长（小时）"}  # y轴标签改为中文
-        )
-        fig_study_box.update_layout(yaxis_title="学习时长（小时）")
-        st.plotly_chart(fig_study_box, use_container_width=True)
+        st.plotly_chart(figures["study_box"], use_container_width=True)
+
 
 # ---------------------- 3. 成绩预测界面 ----------------------
-elif page == "成绩预测":
+def render_prediction():
+    """成绩预测页：加载模型、学号索引与假设分析引擎（均按版本缓存在进程内）"""
+    import numpy as np
+    import pandas as pd
+    import plotly.graph_objects as go
+    import data
+    from predict import predict_file, predict_scores
+    from linear_predictor import FEATURE_COLS
+    from whatif import PASS_SCORE
+    from training_jobs import STAGE_LABELS
+
+    processed_data, data_version = get_student_data()
+    model, segmented_model = get_models()
+
+    def predictor_for(major: str):
+        """表单所选专业实际使用的预测器（无分专业模型包时为全局模型）"""
+        return segmented_model.for_major(major) if segmented_model is not None else model
+
     st.title("期末成绩预测")
     st.write("请输入学生的学习信息，系统将预测其期末成绩并提供学习建议")
     st.divider()
 
+    # 按学号查询真实记录（学号索引二分定位，记录从列式缓存按行读取）
+    lookup_id = st.text_input("按学号查询学生记录", "", placeholder="输入完整学号或学号前缀")
+    if lookup_id:
+        student_index = get_student_index(data.data_version(data.FILE_PATH) or "mock")
+        with stage("web1.student_lookup", 1):
+            student_record = student_index.lookup(lookup_id)
+        if student_record is not None:
+            record_df = pd.DataFrame([student_record])
+            st.dataframe(record_df, use_container_width=True, hide_index=True)
+            if model is not None:
+                record_score = predict_scores(predictor_for(student_record["major"]), record_df[FEATURE_COLS].to_numpy())[0]
+                st.write(f"该学生预测期末成绩：{record_score} 分")
+        else:
+            candidates = student_index.prefix_search(lookup_id)
+            if candidates:
+                st.write("未找到该学号，相近学号：" + "、".join(candidates))
+            else:
+                st.warning("未找到该学号")
+    st.divider()
+
     # 输入表单（左右分栏）
     with st.form("pred_form"):
         col_left, col_right = st.columns(2)
@@ -301,9 +455,9 @@ elif page == "成绩预测":
     if submit_btn and model is not None:
         # 模型预测
         input_feat = np.array([[study_hours, attendance, midterm_score, homework_rate]])
-        input_scaled = scaler.transform(input_feat)
-        pred_score = model.predict(input_scaled)[0].round(1)
-        pred_score = max(0, min(100, pred_score))
+        major_model = predictor_for(major)
+        with stage("web1.predict", 1):
+            pred_score = predict_scores(major_model, input_feat)[0]
 
         # 展示结果（中文）
         st.subheader("预测结果")
@@ -312,9 +466,133 @@ elif page == "成绩预测":
         # 学习建议+图片
         if pred_score >= 60:
             st.success("🎉 预测成绩及格~建议保持当前学习状态，巩固薄弱知识点！")
-            st.image("congratulations.jpg", width=400)
+            st.image(get_image("congratulations.jpg", 400), width=400)
         else:
             st.warning("💪 预测成绩未及格~建议增加学习时长、提高出勤率，及时向老师和同学请教！")
-            st.image("sad.jpg", width=400)
+            st.image(get_image("sad.jpg", 400), width=400)
+
+        # 敏感性分析：其余输入不变时，单个指标变化对预测成绩的影响（批量预测并按模型版本缓存）
+        st.subheader("敏感性分析")
+        feature_labels = {
+            "study_hours": "每周学习时长（小时）",
+            "attendance": "上课出勤率（%）",
+            "midterm_score": "期中考试分数",
+            "homework_rate": "作业完成率（%）"
+        }
+        whatif_engine = get_whatif_engine(major_model.version, major_model)
+        slider_values = (study_hours, round(attendance * 100), midterm_score, round(homework_rate * 100))
+        with stage("web1.whatif", whatif_engine.n_rows):
+            whatif_curves = whatif_engine.curves(slider_values)
+            required = whatif_engine.required_values(slider_values)
+        if pred_score < PASS_SCORE:
+            tips = [f"{feature_labels[col]}提高到 {value}" for col, value in required.items() if value is not None]
+            st.write("其余条件不变时，达到及格线需要：" + ("；".join(tips) if tips else "单独调整任一指标均无法达到及格线"))
+        curve_cols = st.columns(len(FEATURE_COLS))
+        for curve_col, col, current in zip(curve_cols, FEATURE_COLS, slider_values):
+            with curve_col:
+                fig_curve = go.Figure(go.Scatter(x=whatif_engine.grids[col], y=whatif_curves[col], mode="lines",
+                                                 line=dict(color="#1f77b4"), showlegend=False))
+                fig_curve.add_hline(y=PASS_SCORE, line_dash="dash", line_color="#ff7f0e")
+                fig_curve.add_vline(x=current, line_dash="dot", line_color="#2ca02c")
+                fig_curve.update_layout(xaxis_title=feature_labels[col], yaxis_title="预测期末成绩",
+                                        height=250, margin=dict(l=10, r=10, t=10, b=10))
+                st.plotly_chart(fig_curve, use_container_width=True)
     elif submit_btn:
         st.error("❌ 模型未加载，无法预测")
+
+    # 批量预测（上传CSV，逐块向量化预测）
+    st.divider()
+    st.subheader("批量预测")
+    uploaded_file = st.file_uploader("上传学生数据CSV（字段与原始数据一致）", type="csv")
+    if uploaded_file is not None and model is not None:
+        output = io.StringIO()
+        try:
+            with st.spinner("正在批量预测..."):
+                with stage("web1.predict_file") as s:
+                    stats = predict_file(uploaded_file, output, segmented_model or model)
+                    s.rows = stats["rows"]
+        except ValueError as e:
+            st.error(f"❌ 上传文件无法预测：{e}")
+        else:
+            st.write(f"已预测 {stats['rows']} 名学生，耗时 {stats['seconds']:.2f} 秒（{stats['rows_per_sec']:.0f} 行/秒）")
+            output.seek(0)
+            st.dataframe(pd.read_csv(output, nrows=20), use_container_width=True)
+            st.download_button("下载预测结果", output.getvalue().encode("utf-8"), "predictions.csv", "text/csv")
+    elif uploaded_file is not None:
+        st.error("❌ 模型未加载，无法预测")
+
+    # 后台训练（独立进程中训练，进度定时刷新，不阻塞页面）
+    st.divider()
+    st.subheader("模型训练")
+    training_jobs = get_training_jobs()
+    if segmented_model is not None:
+        st.caption(f"当前预测使用分专业模型包（版本{segmented_model.version}，全局模型版本{model.version if model else '无'}）")
+    elif model is not None:
+        st.caption(f"当前预测使用全局模型（版本{model.version}）")
+    if st.button("后台重新训练模型"):
+        started_job = training_jobs.start(use_feature_store=data_version != MOCK_DATA_VERSION)
+        st.session_state["watching_training_job"] = started_job.job_id
+
+    def show_training_progress():
+        """展示最近一次训练任务的进度与指标；本会话等待的任务结束时整页重新运行"""
+        job = training_jobs.current()
+        if job is None:
+            st.caption("尚未启动训练任务")
+            return
+        st.progress(job.fraction, text=f"任务#{job.job_id}：{STAGE_LABELS.get(job.stage, job.stage)}（已用时{job.elapsed:.1f}秒）")
+        if "r2" in job.metrics:
+            metric_cols = st.columns(4)
+            metric_cols[0].metric("测试集R²", f"{job.metrics['r2']:.3f}")
+            metric_cols[1].metric("测试集MSE", f"{job.metrics['mse']:.3f}")
+            metric_cols[2].metric("训练耗时", f"{job.metrics['fit_seconds'] * 1000:.1f} ms")
+            metric_cols[3].metric("样本数", f"{job.metrics['rows']}")
+        if job.status == "succeeded" and job.metrics.get("segmented_saved") is False:
+            st.warning(f"全局模型已保存并切换（版本{job.metrics.get('model_version')}），"
+                       "但分专业模型未达到R²门槛，按专业预测仍使用原模型包")
+        elif job.status == "succeeded" and job.metrics.get("segmented_version"):
+            st.success(f"新模型已保存并切换（全局模型版本{job.metrics.get('model_version')}，"
+                       f"分专业模型包版本{job.metrics['segmented_version']}）")
+        elif job.status == "succeeded":
+            st.success(f"新模型已保存并切换（版本{job.metrics.get('model_version')}）")
+        elif job.status == "rejected" and job.metrics.get("synthetic"):
+            st.warning("训练数据为模拟数据，未替换当前模型")
+        elif job.status == "rejected":
+            st.warning("模型未达到R²门槛，未替换当前模型")
+        elif job.status == "failed":
+            st.error(f"训练失败：{job.error}")
+        if job.done and st.session_state.get("watching_training_job") == job.job_id:
+            # 整页重新运行：加载新模型，并停止定时刷新
+            st.session_state["watching_training_job"] = None
+            st.rerun(scope="app")
+
+    # 仅在任务运行期间定时刷新该片段，其余部分不重新运行
+    current_job = training_jobs.current()
+    st.fragment(show_training_progress, run_every=1.0 if current_job is not None and not current_job.done else None)()
+
+# ---------------------- 侧边栏导航（只执行当前页面） ----------------------
+PAGES = {
+    "项目介绍": ("intro", render_intro),
+    "专业数据分析": ("analysis", render_major_analysis),
+    "成绩预测": ("predict", render_prediction)
+}
+st.sidebar.title("导航菜单")
+page = st.sidebar.radio("页面", list(PAGES), label_visibility="collapsed")
+page_key, render_page = PAGES[page]
+with stage(f"web1.page.{page_key}"):
+    render_page()
+
+# ---------------------- 诊断视图（隐藏，URL参数 ?diag=1 开启） ----------------------
+if show_diagnostics:
+    with st.sidebar.expander("诊断信息（阶段耗时）", expanded=False):
+        diag_records = instrument.records(diag_session)
+        if diag_records:
+            import pandas as pd
+            diag_df = pd.DataFrame(diag_records)
+            st.dataframe(diag_df[["stage", "wall_seconds", "cpu_seconds", "rows", "peak_memory_delta_mb"]].tail(30),
+                         use_container_width=True)
+            st.download_button("下载JSON", instrument.records_json(diag_session).encode("utf-8"), "diagnostics.json",
+                               "application/json")
+        else:
+            st.write("暂无记录")
+        if st.button("清空记录"):
+            instrument.clear(diag_session)
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+import numpy as np
+
+from linear_predictor import FEATURE_COLS
+from predict import predict_scores
+
+# ---------------------- 1. 配置参数 ----------------------
+# 成绩预测页滑块的取值范围（整数）
+SLIDER_RANGES = {
+    "study_hours": (0, 30),
+    "attendance": (0, 100),
+    "midterm_score": (0, 100),
+    "homework_rate": (0, 100)
+}
+# 滑块值 → 模型输入的换算系数（出勤率、作业完成率滑块为百分数，模型输入为小数）
+SLIDER_SCALE = {"study_hours": 1.0, "attendance": 0.01, "midterm_score": 1.0, "homework_rate": 0.01}
+# 及格线
+PASS_SCORE = 60
+# 每个模型版本缓存的输入组合数
+CACHE_SIZE = 4096
+
+
+# ---------------------- 2. 假设分析引擎 ----------------------
+class WhatIfEngine:
+    """以当前输入为基点，逐个特征扫描其滑块全部取值，一次批量预测得到各特征的敏感性曲线（按模型版本缓存）"""
+
+    def __init__(self, predictor):
+        self.predictor = predictor
+        self.version = predictor.version
+        self._cache = OrderedDict()
+        # 各特征的滑块取值网格，以及在批量输入矩阵中的行区间
+        self.grids = {col: np.arange(low, high + 1) for col, (low, high) in SLIDER_RANGES.items()}
+        self._offsets = {}
+        offset = 0
+        for col in FEATURE_COLS:
+            self._offsets[col] = (offset, offset + len(self.grids[col]))
+            offset += len(self.grids[col])
+        self.n_rows = offset
+
+    def curves(self, base: tuple) -> dict:
+        """base为按FEATURE_COLS顺序的滑块值；返回 特征 → 该特征取遍滑块范围时的预测成绩数组"""
+        key = tuple(int(value) for value in base)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        scale = np.array([SLIDER_SCALE[col] for col in FEATURE_COLS])
+        X = np.tile(np.array(key, dtype=np.float64) * scale, (self.n_rows, 1))
+        for j, col in enumerate(FEATURE_COLS):
+            start, end = self._offsets[col]
+            X[start:end, j] = self.grids[col] * scale[j]
+        scores = predict_scores(self.predictor, X)
+        result = {col: scores[start:end] for col, (start, end) in self._offsets.items()}
+
+        self._cache[key] = result
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return result
+
+    def required_values(self, base: tuple, target: float = PASS_SCORE) -> dict:
+        """其余输入不变时，各特征至少需要达到的滑块值才能使预测成绩≥target（当前已达到或无法达到时为None）"""
+        curves = self.curves(base)
+        required = {}
+        for j, col in enumerate(FEATURE_COLS):
+            grid = self.grids[col]
+            reachable = np.nonzero((curves[col] >= target) & (grid > base[j]))[0]
+            current_ok = curves[col][np.searchsorted(grid, base[j])] >= target
+            required[col] = None if current_ok or len(reachable) == 0 else int(grid[reachable[0]])
+        return required